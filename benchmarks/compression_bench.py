@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import contextlib
+import paramiko
+from types import SimpleNamespace
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import server
+from core.batch import tar_download, tar_upload
+
+#########################################################
+### ||| Batch compression over a slow link, by data ||| ###
+#########################################################
+
+# The data sets -> the text compress well, the jpg is already compressed
+datasets = ("text", "jpg")
+
+# The batch compression to compare
+compressions = ("none", "gz", "xz")
+
+# Make the files of one data set -> the relative paths
+def make_data(kind: str, root: Path, files: int, size: int) -> list[str]:
+
+    relatives = []
+
+    for index in range(files):
+        if kind == "text":
+            relative = f"logs/app-{index}.csv" if index % 2 else f"logs/app-{index}.log"
+            line = f"{index},2024-01-01T00:00:{index % 60:02d},GET,/api/items/{index},200,{index * 7 % 1000}\n".encode()
+            data = (line * (size // len(line) + 1))[:size]
+
+        else:
+            relative = f"photos/img-{index}.jpg"
+            data = os.urandom(size)
+
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        relatives.append(relative)
+
+    return relatives
+
+# Open the SFTP to the stand-in server
+def connect(port: int, ssh_compression: bool):
+
+    transport = paramiko.Transport(("127.0.0.1", port))
+    transport.use_compression(ssh_compression)
+    transport.connect(username=server.username, password=server.password)
+
+    return SimpleNamespace(sftp=paramiko.SFTPClient.from_transport(transport), transport=transport)
+
+# CPU seconds of this process and the finished child, the server and its tar are both here
+def cpu_time() -> float:
+
+    total = 0.0
+
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+
+    return total
+
+# Copy one data set up and down with one setting -> the results
+def measure(port: int, kind: str, relatives: list[str], source: Path, work: Path, compression: str, level: int, ssh_compression: bool) -> list[dict]:
+
+    sftp = connect(port, ssh_compression)
+    results = []
+
+    try:
+        for direction in ("upload", "download"):
+            target = work / direction
+            shutil.rmtree(target, ignore_errors=True)
+            target.mkdir()
+
+            for relative in relatives:
+                (target / relative).parent.mkdir(parents=True, exist_ok=True)
+
+            server.take_wire_bytes()
+            cpu = cpu_time()
+            start = time.perf_counter()
+
+            # The core print the warning only, keep the output clean
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                if direction == "upload":
+                    done = tar_upload(sftp, str(source), str(target), relatives, compression, level)
+
+                else:
+                    done = tar_download(sftp, str(source), str(target), relatives, compression, level)
+
+            seconds = time.perf_counter() - start
+
+            results.append({
+                "data": kind,
+                "direction": direction,
+                "compression": compression,
+                "ssh_compression": ssh_compression,
+                "files": len(done or []),
+                "seconds": round(seconds, 3),
+                "cpu_seconds": round(cpu_time() - cpu, 3),
+                "wire_mb": round(server.take_wire_bytes() / (1024 * 1024), 3),
+            })
+
+    finally:
+        sftp.sftp.close()
+        sftp.transport.close()
+
+    return results
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Compare the batch compression and the SSH compression on a slow link")
+    parser.add_argument("--files", type=int, default=200, help="Files per data set")
+    parser.add_argument("--size-kb", type=int, default=32, help="Size of one file in KiB")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="Round-trip latency of the link")
+    parser.add_argument("--bandwidth-mb", type=float, default=2.0, help="Bandwidth of the link in MiB/s, 0 = not limited")
+    parser.add_argument("--level", type=int, default=1, help="Compression level, 1 (fast) to 9 (small)")
+    parser.add_argument("--output", help="Write the results as JSON to the file")
+    args = parser.parse_args()
+
+    port = server.serve(latency=args.latency_ms / 1000, bandwidth=args.bandwidth_mb * 1024 * 1024)
+    work = Path(tempfile.mkdtemp(prefix="vsfs-compress-"))
+    results = []
+
+    try:
+        for kind in datasets:
+            source = work / f"source-{kind}"
+            relatives = make_data(kind, source, args.files, args.size_kb * 1024)
+
+            for ssh_compression in (False, True):
+                for compression in compressions:
+                    for result in measure(port, kind, relatives, source, work, compression, args.level, ssh_compression):
+                        results.append(result)
+                        print(f"{result['data']:>5} {result['direction']:>8} batch={result['compression']:<4} "
+                              f"ssh={'on' if ssh_compression else 'off':<3} {result['seconds']:>8.3f} s "
+                              f"{result['cpu_seconds']:>8.3f} cpu-s {result['wire_mb']:>9.3f} MB on the wire")
+
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+
+if __name__ == "__main__":
+    main()
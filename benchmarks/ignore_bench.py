@@ -0,0 +1,100 @@
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.ignore import IgnoreRules
+from core.scan import scan_tree
+
+##############################################################
+### ||| Cost of the ignore rules, against the local walk ||| ###
+##############################################################
+
+# The usual rules of a source tree
+rules: list[str] = [
+    ".git/", "node_modules/", "__pycache__/", "*.pyc", "*.o", "*.tmp", ".cache/",
+    "/build/", "/dist/", "*.egg-info/", "logs/**/*.log", "!logs/keep/*.log", ".DS_Store", "*.sw[po]",
+]
+
+# Synthetic relative paths, 100 entries in every directory, 3 level deep, same shape as index_memory.py
+def paths(count: int):
+
+    for index in range(count):
+        directory = f"project{index // 100000:02d}/module{index // 1000 % 100:02d}/package{index // 100 % 10}"
+
+        yield f"{directory}/file{index % 100:02d}_{index}.py", index % 100 == 0
+
+# Make a small tree on disk, for the walk to compare with
+def make_tree(root: Path, count: int) -> None:
+
+    for index in range(count):
+        path = root / f"module{index // 1000:02d}" / f"package{index // 100 % 10}" / f"file{index % 100:02d}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Measure the ignore matching per entry, and the walk per entry")
+    parser.add_argument("--entries", type=int, default=1000000, help="Number of synthetic paths to match")
+    parser.add_argument("--walk-entries", type=int, default=100000, help="Number of files on disk for the walk")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    ignore = IgnoreRules(rules)
+    items = list(paths(args.entries))
+
+    # The walker check the entries of one directory together, same here
+    start = time.perf_counter()
+    directory, ignored = None, None
+
+    for relative, is_dir in items:
+        parent, _, name = relative.rpartition("/")
+
+        if parent != directory:
+            directory, ignored = parent, ignore.for_dir(parent)
+
+        ignored(name, is_dir)
+
+    match = (time.perf_counter() - start) / args.entries
+
+    # One path at a time, like the watch event
+    start = time.perf_counter()
+
+    for relative, is_dir in items:
+        ignore.ignored(relative, is_dir)
+
+    match_path = (time.perf_counter() - start) / args.entries
+
+    with tempfile.TemporaryDirectory(prefix="vsfs-ignore-") as work:
+        make_tree(Path(work), args.walk_entries)
+        start = time.perf_counter()
+        found = scan_tree(work)
+        walk = (time.perf_counter() - start) / len(found)
+
+        start = time.perf_counter()
+        scan_tree(work, ignore=ignore)
+        walk_ignore = (time.perf_counter() - start) / len(found)
+
+    result = {
+        "rules": len(ignore.rules),
+        "match_us_per_entry": round(match * 1e6, 3),
+        "match_whole_path_us_per_entry": round(match_path * 1e6, 3),
+        "walk_us_per_entry": round(walk * 1e6, 3),
+        "walk_with_rules_us_per_entry": round(walk_ignore * 1e6, 3),
+        "match_share_of_walk": f"{match / walk:.1%}",
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+
+    else:
+        for key, value in result.items():
+            print(f"{key:>30}: {value}")
+
+if __name__ == "__main__":
+    main()
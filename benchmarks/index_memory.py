@@ -0,0 +1,85 @@
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.index import FileIndex, files_info
+
+############################################################
+### ||| Memory per entry, dict against the FileIndex ||| ###
+############################################################
+
+# The target bytes per entry of the FileIndex, on 64-bit CPython
+# The unique name cost the most, the name string is the biggest part of the entry
+targets: dict = {"index": 200, "index_repeated_names": 100}
+
+# Synthetic tree -> (path, info), 100 files in every directory, 3 level deep
+# unique=False repeat the same 100 names in every directory, like IMG_0001.JPG
+def entries(count: int, unique: bool = True):
+
+    for index in range(count):
+        directory = f"project{index // 100000:02d}/module{index // 1000 % 100:02d}/package{index // 100 % 10}"
+        name = f"file{index % 100:02d}_{index}.py" if unique else f"file{index % 100:02d}.py"
+        yield f"{directory}/{name}", files_info(1024 + index % 4096, 1700000000.0 + index, 0o100644)
+
+# Build one map, and measure the memory it hold, and the time
+def measure(make, count: int, unique: bool) -> dict:
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = make()
+
+    for path, info in entries(count, unique):
+        result[path] = info
+
+    build = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+
+    for path, _ in entries(count, unique):
+        result[path]
+
+    lookup = time.perf_counter() - start
+
+    return {"bytes_per_entry": round(size / count, 1), "total_mb": round(size / (1024 * 1024), 1),
+            "build_s": round(build, 3), "lookup_s": round(lookup, 3)}
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Measure the memory per entry of the file index")
+    parser.add_argument("--entries", type=int, default=1000000, help="Number of synthetic entries")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    report = {
+        "entries": args.entries,
+        "target_bytes_per_entry": targets,
+        "dict": measure(dict, args.entries, True),
+        "index": measure(FileIndex, args.entries, True),
+        "dict_repeated_names": measure(dict, args.entries, False),
+        "index_repeated_names": measure(FileIndex, args.entries, False),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+
+        return
+
+    for name in ("dict", "index", "dict_repeated_names", "index_repeated_names"):
+        result = report[name]
+        print(f"{name:<20} {result['bytes_per_entry']:>7} bytes/entry | {result['total_mb']:>7} MB | "
+              f"build {result['build_s']}s | lookup {result['lookup_s']}s")
+
+    for name, target in targets.items():
+        verdict = "OK" if report[name]["bytes_per_entry"] <= target else "OVER"
+        print(f"Target {name} {target} bytes/entry: {verdict}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.scan import scan_tree
+
+###############################################################
+### ||| Local scan, the old Path walker against scandir ||| ###
+###############################################################
+
+# The old list_client walker, Path.iterdir() with is_dir(), is_file() and stat()
+def legacy_walk(root: Path) -> dict:
+
+    result = {}
+
+    def _walk(client_dir: Path) -> None:
+
+        for entry in client_dir.iterdir():
+            relative = str(entry.relative_to(root))
+
+            if entry.is_dir():
+                status = entry.stat()
+                result[relative] = (0, status.st_mtime, status.st_mode)
+                _walk(entry)
+
+            elif entry.is_file():
+                status = entry.stat()
+                result[relative] = (status.st_size, status.st_mtime, status.st_mode)
+
+    _walk(root)
+
+    return result
+
+# Empty files, 1000 in every directory, 2 level deep
+def make_tree(root: Path, files: int) -> None:
+
+    for index in range(files):
+        directory = root / f"group{index // 100000:03d}" / f"dir{index // 1000 % 100:03d}"
+
+        if index % 1000 == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+
+        os.close(os.open(directory / f"file{index:07d}.dat", os.O_CREAT | os.O_WRONLY, 0o644))
+
+# Time one walker, the best of the runs
+def measure(walk, runs: int) -> tuple[float, int]:
+
+    best = None
+    count = 0
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        count = len(walk())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, count
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Benchmark the local scanner against the old Path walker")
+    parser.add_argument("--files", type=int, default=1000000, help="Number of files in the synthetic tree")
+    parser.add_argument("--root", help="Use (or make once) the tree in this directory, instead of a temporary one")
+    parser.add_argument("--workers", default="1,8", help="Comma list of scan_workers to measure")
+    parser.add_argument("--runs", type=int, default=3, help="Take the best of N runs, the disk cache is warm")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    root = Path(args.root or tempfile.mkdtemp(prefix="vsfs-scan-"))
+
+    root.mkdir(parents=True, exist_ok=True)
+
+    if not any(root.iterdir()):
+        print(f"Making {args.files} files in {root}...")
+        make_tree(root, args.files)
+
+    results = {}
+    results["legacy"] = measure(lambda: legacy_walk(root), args.runs)
+
+    for workers in map(int, args.workers.split(",")):
+        results[f"scandir_{workers}"] = measure(lambda: scan_tree(root, workers), args.runs)
+
+    report = {name: {"seconds": round(seconds, 3), "entries": count, "entries_per_s": round(count / seconds)}
+              for name, (seconds, count) in results.items()}
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+
+        return
+
+    legacy = report["legacy"]["seconds"]
+
+    for name, result in report.items():
+        print(f"{name:<12} {result['seconds']:>8}s | {result['entries']} entries | "
+              f"{result['entries_per_s']:>9} entries/s | {legacy / result['seconds']:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+import os
+import time
+import socket
+import threading
+import subprocess
+import paramiko
+from collections import deque
+from paramiko import ServerInterface, SFTPServerInterface, SFTPServer, SFTPAttributes, SFTPHandle
+from paramiko import SFTP_OK, AUTH_SUCCESSFUL, AUTH_FAILED, OPEN_SUCCEEDED
+
+##########################################################
+### ||| In-process SFTP server, for the benchmarks ||| ###
+##########################################################
+
+# The login of the stand-in server
+username: str = "vsfs"
+password: str = "vsfs"
+
+# Accept the benchmark user, and the session / exec channel
+class _Server(ServerInterface):
+
+    def check_auth_password(self, user, secret):
+
+        return AUTH_SUCCESSFUL if (user, secret) == (username, password) else AUTH_FAILED
+
+    def get_allowed_auths(self, user):
+
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+
+        return OPEN_SUCCEEDED
+
+    # Run the command with local shell, like sshd
+    def check_channel_exec_request(self, channel, command):
+
+        threading.Thread(target=_exec, args=(channel, command.decode()), daemon=True).start()
+
+        return True
+
+# Pipe the channel to the command, and send the exit status
+def _exec(channel, command: str) -> None:
+
+    process = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _feed() -> None:
+
+        try:
+            for data in iter(lambda: channel.recv(32768), b""):
+                process.stdin.write(data)
+
+        except (OSError, EOFError):
+
+            pass
+
+        finally:
+            process.stdin.close()
+
+    threading.Thread(target=_feed, daemon=True).start()
+
+    for data in iter(lambda: process.stdout.read1(32768), b""):
+        channel.sendall(data)
+
+    channel.sendall_stderr(process.stderr.read())
+    channel.send_exit_status(process.wait())
+    channel.close()
+
+# Open file on the server side
+class _Handle(SFTPHandle):
+
+    def stat(self):
+
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+
+        if attr._flags & attr.FLAG_SIZE:
+            self.writefile.truncate(attr.st_size)
+
+        return SFTP_OK
+
+# The SFTP operations, straight on the local file system
+class _SFTPInterface(SFTPServerInterface):
+
+    def _call(self, function):
+
+        try:
+
+            return function()
+
+        except OSError as e:
+
+            return SFTPServer.convert_errno(e.errno)
+
+    def list_folder(self, path):
+
+        def _list():
+
+            result = []
+
+            for name in os.listdir(path):
+                attr = SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)))
+                attr.filename = name
+                result.append(attr)
+
+            return result
+
+        return self._call(_list)
+
+    def stat(self, path):
+
+        return self._call(lambda: SFTPAttributes.from_stat(os.stat(path)))
+
+    def lstat(self, path):
+
+        return self._call(lambda: SFTPAttributes.from_stat(os.lstat(path)))
+
+    def open(self, path, flags, attr):
+
+        def _open():
+
+            fd = os.open(path, flags, 0o644)
+
+            if flags & os.O_WRONLY:
+                mode = "ab" if flags & os.O_APPEND else "wb"
+
+            elif flags & os.O_RDWR:
+                mode = "a+b" if flags & os.O_APPEND else "r+b"
+
+            else:
+                mode = "rb"
+
+            handle = _Handle(flags)
+            handle.filename = path
+            handle.readfile = handle.writefile = os.fdopen(fd, mode)
+
+            return handle
+
+        return self._call(_open)
+
+    def remove(self, path):
+
+        return self._call(lambda: os.remove(path) or SFTP_OK)
+
+    def rename(self, oldpath, newpath):
+
+        return self._call(lambda: os.rename(oldpath, newpath) or SFTP_OK)
+
+    def posix_rename(self, oldpath, newpath):
+
+        return self._call(lambda: os.replace(oldpath, newpath) or SFTP_OK)
+
+    def mkdir(self, path, attr):
+
+        return self._call(lambda: os.mkdir(path) or SFTP_OK)
+
+    def rmdir(self, path):
+
+        return self._call(lambda: os.rmdir(path) or SFTP_OK)
+
+    def chattr(self, path, attr):
+
+        def _chattr():
+
+            if attr._flags & attr.FLAG_AMTIME:
+                os.utime(path, (attr.st_atime, attr.st_mtime))
+
+            if attr._flags & attr.FLAG_PERMISSIONS:
+                os.chmod(path, attr.st_mode & 0o7777)
+
+            if attr._flags & attr.FLAG_SIZE:
+                os.truncate(path, attr.st_size)
+
+            return SFTP_OK
+
+        return self._call(_chattr)
+
+"""------------------------
+||| The Slow Link Proxy |||
+------------------------"""
+
+# The bytes that went through the proxy, both direction
+wire_bytes: int = 0
+_wire_lock = threading.Lock()
+
+# Read the byte count, and start again from zero
+def take_wire_bytes() -> int:
+    global wire_bytes
+
+    with _wire_lock:
+        count, wire_bytes = wire_bytes, 0
+
+    return count
+
+# Forward one direction, every chunk arrive after the latency, and not faster than the bandwidth
+def _forward(source: socket.socket, target: socket.socket, latency: float, bandwidth: float) -> None:
+    global wire_bytes
+
+    pending: deque = deque()
+    ready = threading.Condition()
+    closed = False
+
+    def _read() -> None:
+        nonlocal closed
+
+        try:
+            for data in iter(lambda: source.recv(65536), b""):
+                with ready:
+                    pending.append((time.monotonic() + latency, data))
+                    ready.notify()
+
+        except OSError:
+
+            pass
+
+        with ready:
+            closed = True
+            ready.notify()
+
+    threading.Thread(target=_read, daemon=True).start()
+
+    try:
+        while True:
+            with ready:
+                while not pending and not closed:
+                    ready.wait()
+
+                if not pending:
+
+                    break
+
+                due, data = pending.popleft()
+
+            delay = due - time.monotonic()
+
+            if delay > 0:
+                time.sleep(delay)
+
+            target.sendall(data)
+
+            with _wire_lock:
+                wire_bytes += len(data)
+
+            if bandwidth:
+                time.sleep(len(data) / bandwidth)
+
+    except OSError:
+
+        pass
+
+    finally:
+        target.close()
+
+# Listen on loopback, and forward every connection to the port through the slow link
+def _proxy(port: int, latency: float, bandwidth: float) -> int:
+
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+
+    def _accept() -> None:
+
+        while True:
+            client, _ = listener.accept()
+            server = socket.create_connection(("127.0.0.1", port))
+
+            for source, target in ((client, server), (server, client)):
+                threading.Thread(target=_forward, args=(source, target, latency / 2, bandwidth), daemon=True).start()
+
+    threading.Thread(target=_accept, daemon=True).start()
+
+    return listener.getsockname()[1]
+
+"""---------------------------
+||| The Stand-in SFTP Server |||
+---------------------------"""
+
+# Start the server thread -> the port to connect
+def serve(latency: float = 0.0, bandwidth: float = 0.0) -> int:
+
+    # latency is the round-trip in seconds, bandwidth is bytes per second (0 = not limited)
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket()
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(64)
+
+    def _accept() -> None:
+
+        while True:
+            client, _ = listener.accept()
+            transport = paramiko.Transport(client)
+            transport.add_server_key(host_key)
+            transport.use_compression(True)
+            transport.set_subsystem_handler("sftp", SFTPServer, _SFTPInterface)
+            transport.start_server(server=_Server())
+
+    threading.Thread(target=_accept, daemon=True).start()
+    port = listener.getsockname()[1]
+
+    if latency or bandwidth:
+
+        return _proxy(port, latency, bandwidth)
+
+    return port
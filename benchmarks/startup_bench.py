@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+# The main directory, where vsfs.py is
+main_dir = Path(__file__).resolve().parent.parent
+
+##################################################
+### ||| Startup time of the command line ||| ###
+##################################################
+
+# The commands to time -> (name, arguments after python)
+# "import core.main" is what every run cost before, the old vsfs.py imported it at load
+commands = (
+    ("python", ["-c", "pass"]),
+    ("vsfs --help", [str(main_dir / "vsfs.py"), "--help"]),
+    ("vsfs check", [str(main_dir / "vsfs.py"), "check"]),
+    ("import core.main", ["-c", "import core.main"]),
+)
+
+# A config.py that check accept, the server is never connected
+def make_config(root: Path) -> None:
+
+    (root / "config").mkdir()
+    (root / "client").mkdir()
+    (root / "config" / "config.py").write_text(
+        "from pathlib import Path\n"
+        f"server_location: Path = Path('/srv/vsfs/')\n"
+        f"client_location: Path = Path('{root / 'client'}/')\n"
+        "user_config: int = 1\n"
+        'sftp_config: dict = {"host": "127.0.0.1", "port": 22, "username": "vsfs", "password": "vsfs"}\n'
+    )
+
+# Run one command N times -> the wall time of every run, in milliseconds
+def measure(arguments: list[str], runs: int, cwd: Path, env: dict) -> list[float]:
+
+    times = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *arguments], cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+
+    return times
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Measure the startup time of the vsfs commands that don't connect")
+    parser.add_argument("--runs", type=int, default=20, help="Runs of every command")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="The median that --help and check must stay under")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="vsfs-startup-") as work:
+        work = Path(work)
+        make_config(work)
+
+        # config.py from the work directory, the core from the main directory
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(work), str(main_dir)]))
+        results = []
+
+        for name, arguments in commands:
+            times = measure(arguments, args.runs, work, env)
+            results.append({
+                "command": name,
+                "median_ms": round(statistics.median(times), 1),
+                "min_ms": round(min(times), 1),
+                "max_ms": round(max(times), 1),
+            })
+
+    budget = [result for result in results if result["command"].startswith("vsfs")]
+    passed = all(result["median_ms"] <= args.budget_ms for result in budget)
+
+    if args.json:
+        print(json.dumps({"budget_ms": args.budget_ms, "passed": passed, "results": results}, indent=2))
+
+    else:
+        for result in results:
+            print(f"{result['command']:>18}: median {result['median_ms']:>7.1f} ms, min {result['min_ms']:>7.1f} ms, max {result['max_ms']:>7.1f} ms")
+
+        print(f"\nBudget {args.budget_ms} ms for --help and check: {'passed' if passed else 'FAILED'}")
+
+    sys.exit(0 if passed else 1)
+
+if __name__ == "__main__":
+    main()
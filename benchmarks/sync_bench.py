@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+root_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks import server
+from benchmarks.trees import trees
+
+#######################################################
+### ||| Sync benchmark against a stand-in server ||| ###
+#######################################################
+
+# The sync modes -> (download, upload)
+modes = {
+    "get": (True, False),
+    "put": (False, True),
+    "sync": (True, True),
+    "noop": (True, True),
+}
+
+# Write the config.py that the core read
+def write_config(config_dir: Path, server_dir: Path, client_dir: Path, port: int, settings: dict) -> None:
+
+    config_dir.mkdir(parents=True, exist_ok=True)
+    sftp_config = {"host": "127.0.0.1", "port": port, "username": server.username, "password": server.password}
+    lines = [
+        "from pathlib import Path",
+        f"server_location: Path = Path({str(server_dir)!r})",
+        f"client_location: Path = Path({str(client_dir)!r})",
+        "user_config: int = 1",
+        f"sftp_config: dict = {sftp_config!r}",
+    ]
+    lines += [f"{key} = {value!r}" for key, value in settings.items()]
+    (config_dir / "config.py").write_text("\n".join(lines) + "\n")
+
+# Sum of the file size under the directory
+def tree_bytes(path: Path) -> int:
+
+    return sum(entry.stat().st_size for entry in path.rglob("*") if entry.is_file())
+
+# Run one case in this process -> the result
+def run_case(tree: str, mode: str, latency: float, bandwidth: float, scale: float, settings: dict) -> dict:
+
+    port = server.serve(latency=latency, bandwidth=bandwidth)
+    work = Path(tempfile.mkdtemp(prefix="vsfs-bench-"))
+    server_dir = work / "server"
+    client_dir = work / "client"
+    server_dir.mkdir()
+    client_dir.mkdir()
+
+    # The data for the mode
+    if mode in ("get", "sync", "noop"):
+        trees[tree](server_dir / "from-server", scale)
+
+    if mode in ("put", "sync"):
+        trees[tree](client_dir / "from-client", scale)
+
+    write_config(work / "config", server_dir, client_dir, port, settings)
+    sys.path.insert(0, str(work))
+
+    import core.main as vsfs
+
+    download, upload = modes[mode]
+    result = {"tree": tree, "mode": mode, "latency_ms": latency * 1000, "bandwidth_mb_s": bandwidth / (1024 * 1024)}
+
+    # The core print every file, keep the benchmark output clean
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        sftp = vsfs.SFTP()
+        state = vsfs.SyncState(vsfs.state_file)
+
+        try:
+            if mode == "noop":
+                vsfs.stream_sync(sftp, state, download, upload)
+
+            start = time.perf_counter()
+            server_map = vsfs.list_server(sftp)
+            client_map = vsfs.list_client()
+            result["walk_s"] = round(time.perf_counter() - start, 4)
+
+            start = time.perf_counter()
+            vsfs.compute_diffs(server_map, client_map, vsfs.load_baseline(state))
+            result["diff_s"] = round(time.perf_counter() - start, 4)
+            result["entries"] = len(set(server_map) | set(client_map))
+
+            start = time.perf_counter()
+            pending, downloaded, uploaded = vsfs.stream_sync(sftp, state, download, upload)
+            elapsed = time.perf_counter() - start
+
+        finally:
+            state.close()
+            sftp.close()
+
+    copied = [client_dir / path for path in downloaded] + [server_dir / path for path in uploaded]
+    files = [path for path in copied if path.is_file()]
+    size = sum(path.stat().st_size for path in files)
+
+    result["sync_s"] = round(elapsed, 4)
+    result["files"] = len(files)
+    result["bytes"] = size
+    result["files_per_s"] = round(len(files) / elapsed, 2) if elapsed else 0
+    result["mb_per_s"] = round(size / (1024 * 1024) / elapsed, 2) if elapsed else 0
+
+    # Linux give the peak RSS in KB
+    result["peak_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    return result
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Benchmark vsfs walk, diff, and copy against an in-process SFTP server")
+    parser.add_argument("--trees", default=",".join(trees), help="Comma list of: " + ", ".join(trees))
+    parser.add_argument("--modes", default=",".join(modes), help="Comma list of: " + ", ".join(modes))
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Injected round-trip latency")
+    parser.add_argument("--bandwidth-mb", type=float, default=0.0, help="Injected bandwidth limit in MB/s, 0 is not limited")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the size of the synthetic trees")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Extra config.py setting, like transfer_workers=8")
+    parser.add_argument("--output", help="Write the JSON result to this file")
+    parser.add_argument("--child", nargs=2, metavar=("TREE", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    settings = {}
+
+    for item in args.set:
+        key, value = item.split("=", 1)
+        settings[key] = json.loads(value) if value[:1] in "0123456789[{\"-tfn" else value
+
+    latency = args.latency_ms / 1000
+    bandwidth = args.bandwidth_mb * 1024 * 1024
+
+    # Every case in own process, so the peak RSS is only for that case
+    if args.child:
+        print(json.dumps(run_case(args.child[0], args.child[1], latency, bandwidth, args.scale, settings)))
+
+        return
+
+    results = []
+
+    for tree in args.trees.split(","):
+        for mode in args.modes.split(","):
+            command = [sys.executable, __file__, "--child", tree, mode, "--latency-ms", str(args.latency_ms),
+                       "--bandwidth-mb", str(args.bandwidth_mb), "--scale", str(args.scale)]
+
+            for item in args.set:
+                command += ["--set", item]
+
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            results.append(result)
+            print(f"{tree:<6} {mode:<5} walk {result['walk_s']:>8}s | diff {result['diff_s']:>7}s | sync {result['sync_s']:>8}s | "
+                  f"{result['files_per_s']:>9} files/s | {result['mb_per_s']:>8} MB/s | RSS {result['peak_rss_mb']} MB")
+
+    report = {"python": sys.version.split()[0], "latency_ms": args.latency_ms, "bandwidth_mb_s": args.bandwidth_mb,
+              "scale": args.scale, "settings": settings, "results": results}
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=4))
+        print(f"Result written to {args.output}")
+
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+import argparse
+import getpass
+import tempfile
+import paramiko
+from types import SimpleNamespace
+from pathlib import Path
+
+# Run from the main directory, or from benchmarks/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.resume import resumable_get, resumable_put
+
+#####################################################
+### ||| Throughput of the copy path, in MB/s ||| ###
+####################################################
+
+# The settings to compare -> (name, window_size, max_packet_size, request_size, prefetch_requests)
+profiles = [
+    ("paramiko default", 2 * 1024 * 1024, 32 * 1024, 32 * 1024, None),
+    ("window 16 MB", 16 * 1024 * 1024, 32 * 1024, 32 * 1024, 128),
+    ("window 64 MB", 64 * 1024 * 1024, 32 * 1024, 32 * 1024, 256),
+    ("window 16 MB, request 256 KB", 16 * 1024 * 1024, 256 * 1024, 256 * 1024, 128),
+]
+
+# Open the SFTP with one profile
+def connect(args, window_size: int, max_packet_size: int):
+
+    transport = paramiko.Transport((args.host, args.port), default_window_size=window_size, default_max_packet_size=max_packet_size)
+
+    if args.key:
+        transport.connect(username=args.username, pkey=paramiko.RSAKey.from_private_key_file(args.key))
+
+    else:
+        transport.connect(username=args.username, password=args.password)
+
+    client = paramiko.SFTPClient.from_transport(transport, window_size=window_size, max_packet_size=max_packet_size)
+
+    return SimpleNamespace(sftp=client, transport=transport)
+
+# Copy the file up and down, return the MB/s of both
+def measure(args, local_file: str, size: int, profile: tuple) -> dict:
+
+    name, window_size, max_packet_size, request_size, prefetch_requests = profile
+    sftp = connect(args, window_size, max_packet_size)
+    remote_file = f"{args.remote_dir.rstrip('/')}/vsfs-bench-{os.getpid()}.bin"
+    local_copy = local_file + ".down"
+    mtime = os.path.getmtime(local_file)
+
+    try:
+        start = time.perf_counter()
+        resumable_put(sftp, local_file, remote_file, size, mtime, request_size=request_size)
+        upload = time.perf_counter() - start
+
+        start = time.perf_counter()
+        resumable_get(sftp, remote_file, local_copy, size, mtime, prefetch_requests=prefetch_requests, request_size=request_size)
+        download = time.perf_counter() - start
+
+    finally:
+        for path in (remote_file,):
+
+            try:
+                sftp.sftp.remove(path)
+
+            except IOError:
+
+                pass
+
+        if os.path.exists(local_copy):
+            os.remove(local_copy)
+
+        sftp.sftp.close()
+        sftp.transport.close()
+
+    megabytes = size / (1024 * 1024)
+
+    return {"profile": name, "upload_mb_s": round(megabytes / upload, 2), "download_mb_s": round(megabytes / download, 2)}
+
+def main() -> None:
+
+    parser = argparse.ArgumentParser(description="Measure the vsfs copy throughput against a SSH server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=22)
+    parser.add_argument("--username", default=getpass.getuser())
+    parser.add_argument("--password")
+    parser.add_argument("--key", help="RSA private key, instead of password")
+    parser.add_argument("--remote-dir", default="/tmp")
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON")
+    args = parser.parse_args()
+
+    if not args.key and args.password is None:
+        args.password = getpass.getpass("Password: ")
+
+    size = args.size_mb * 1024 * 1024
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local_file = os.path.join(tmp, "bench.bin")
+
+        with open(local_file, "wb") as file:
+            for _ in range(args.size_mb):
+                file.write(os.urandom(1024 * 1024))
+
+        for profile in profiles:
+            results.append(measure(args, local_file, size, profile))
+
+            if not args.json:
+                result = results[-1]
+                print(f"{result['profile']:<32} upload {result['upload_mb_s']:>8} MB/s | download {result['download_mb_s']:>8} MB/s")
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+
+if __name__ == "__main__":
+    main()
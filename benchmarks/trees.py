@@ -0,0 +1,54 @@
+import os
+from pathlib import Path
+
+###############################################
+### ||| Synthetic trees, for the benchmarks ||| ###
+###############################################
+
+# Write one file with the size
+def _write(path: Path, size: int) -> None:
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(path, "wb") as file:
+        while size > 0:
+            chunk = min(size, 1024 * 1024)
+            file.write(os.urandom(chunk))
+            size -= chunk
+
+# Many small files, 100 in each directory
+def small(root: Path, scale: float = 1.0) -> None:
+
+    for index in range(int(2000 * scale)):
+        _write(root / f"dir{index // 100:04d}" / f"file{index:06d}.txt", 1024 + index % 3072)
+
+# Few huge files
+def large(root: Path, scale: float = 1.0) -> None:
+
+    for index in range(4):
+        _write(root / "large" / f"blob{index}.bin", int(32 * 1024 * 1024 * scale))
+
+# Deep nesting, few files on every level
+def deep(root: Path, scale: float = 1.0) -> None:
+
+    level = root
+
+    for depth in range(int(40 * scale)):
+        level = level / f"level{depth:03d}"
+
+        for index in range(5):
+            _write(level / f"file{index}.txt", 2048)
+
+# One wide directory
+def wide(root: Path, scale: float = 1.0) -> None:
+
+    for index in range(int(5000 * scale)):
+        _write(root / "wide" / f"file{index:06d}.txt", 512)
+
+# The tree name -> generator
+trees = {
+    "small": small,
+    "large": large,
+    "deep": deep,
+    "wide": wide,
+}
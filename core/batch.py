@@ -0,0 +1,282 @@
+import io
+import os
+import lzma
+import zlib
+import shlex
+import uuid
+import tarfile
+from typing import Dict, Iterable, Optional
+from colorama import Fore
+from paramiko import ChannelException
+from core.resume import partial_suffix, keep_mode
+from core.throttle import Throttled
+
+"""----------------------------
+||| The Batch Copy Function |||
+----------------------------"""
+
+# The server can run tar over the exec channel, per transport
+_tar_supported: Dict[int, bool] = {}
+
+# Already compressed, compress it again only cost the CPU
+incompressible: set[str] = {
+    ".gz", ".tgz", ".xz", ".txz", ".bz2", ".zst", ".lz4", ".zip", ".7z", ".rar",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".avif",
+    ".mp3", ".mp4", ".m4a", ".m4v", ".mkv", ".mov", ".avi", ".webm", ".ogg", ".opus", ".flac",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".epub", ".jar", ".apk", ".whl",
+}
+
+# Check the file is worth to compress, by the extension
+def compressible(relative: str) -> bool:
+
+    return os.path.splitext(relative)[1].lower() not in incompressible
+
+# The compression of the tar stream -> (remote compress program, remote extract flag, compressor, decompressor)
+def _codec(compression: str, level: int):
+
+    if compression == "gz":
+
+        return f"gzip -{level}", " -z", lambda: zlib.compressobj(level, zlib.DEFLATED, 31), lambda: zlib.decompressobj(31)
+
+    if compression == "xz":
+
+        return f"xz -{level}", " -J", lambda: lzma.LZMACompressor(preset=level), lzma.LZMADecompressor
+
+    return None, "", None, None
+
+# Compress everything that tarfile write, into the channel
+class _CompressWriter:
+
+    def __init__(self, fileobj, compressor):
+        self.fileobj = fileobj
+        self.compressor = compressor
+
+    def write(self, data: bytes) -> int:
+
+        compressed = self.compressor.compress(data)
+
+        if compressed:
+            self.fileobj.write(compressed)
+
+        return len(data)
+
+    # The rest of the compressed data, tarfile don't close the fileobj that given
+    def close(self) -> None:
+
+        self.fileobj.write(self.compressor.flush())
+        self.fileobj.close()
+
+# Decompress the channel, for tarfile to read
+class _DecompressReader:
+
+    def __init__(self, fileobj, decompressor):
+        self.fileobj = fileobj
+        self.decompressor = decompressor
+        self.buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+
+        while (size < 0 or len(self.buffer) < size) and not self.decompressor.eof:
+            chunk = self.fileobj.read(256 * 1024)
+
+            if not chunk:
+
+                break
+
+            self.buffer += self.decompressor.decompress(chunk)
+
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+
+        return data
+
+# Run one command on the server -> the open channel
+def _exec(sftp, command: str):
+
+    channel = sftp.transport.open_session()
+    channel.exec_command(command)
+
+    return channel
+
+# Wait the command, and read what it say -> (exit status, stderr)
+def _finish(channel) -> tuple[int, str]:
+
+    with channel.makefile_stderr("rb") as file:
+        stderr = file.read().decode(errors="replace")
+
+    status = channel.recv_exit_status()
+    channel.close()
+
+    return status, stderr.strip()
+
+# Check the server can run tar, the first batch find it out
+def supported(sftp) -> bool:
+
+    return _tar_supported.get(id(sftp.transport)) is not False
+
+# The exit status of the upload command, when tar is not there or extracted nothing
+_not_extracted: int = 127
+
+# Download the small files in one tar stream -> the relative paths that done, None if the server can't
+# compression -> "none", "gz", or "xz" of the whole stream, level is 1 (fast) to 9 (small)
+# throttle(bytes) wait for the bandwidth limit, it's called with the bytes on the wire
+def tar_download(sftp, remote_root: str, local_root: str, relatives: list[str], compression: str = "none", level: int = 1,
+                 throttle=None) -> Optional[list[str]]:
+
+    key = id(sftp.transport)
+    wanted = set(relatives)
+    done: list[str] = []
+    program, _, _, decompressor = _codec(compression, level)
+    compress = f" --use-compress-program={shlex.quote(program)}" if program else ""
+
+    try:
+        channel = _exec(sftp, f"tar -C {shlex.quote(remote_root)} --null -T - --format=posix{compress} -cf -")
+
+    # No free session now, only this batch go one by one
+    except ChannelException:
+
+        return None
+
+    except Exception:
+        _tar_supported[key] = False
+
+        return None
+
+    # The file list on stdin, one per NUL
+    try:
+        channel.sendall(b"".join(os.fsencode(relative) + b"\0" for relative in relatives))
+        channel.shutdown_write()
+
+    except (OSError, EOFError):
+        channel.close()
+        _tar_supported[key] = False
+
+        return None
+
+    raw = channel.makefile("rb")
+    stream = Throttled(raw, throttle) if throttle else raw
+    stream = _DecompressReader(stream, decompressor()) if decompressor else stream
+
+    try:
+        with tarfile.open(fileobj=stream, mode="r|") as archive:
+            for member in archive:
+
+                # Only the asked file, the name from server is never trusted as a path
+                if not member.isfile() or member.name not in wanted:
+
+                    continue
+
+                local_path = os.path.join(local_root, member.name)
+                partial = local_path + partial_suffix
+                os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+                with archive.extractfile(member) as source, open(partial, "wb") as target:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b""):
+                        target.write(chunk)
+
+                os.utime(partial, (member.mtime, member.mtime))
+                keep_mode(partial, local_path)
+                os.replace(partial, local_path)
+                done.append(member.name)
+
+    except tarfile.ReadError:
+
+        # Nothing came back, tar is not there
+        if not done:
+            _finish(channel)
+            _tar_supported[key] = False
+
+            return None
+
+    finally:
+        raw.close()
+
+    status, stderr = _finish(channel)
+    _tar_supported[key] = True
+
+    # The file that vanished is only missing from done, the next sync try again
+    if status != 0 and stderr:
+        print(f"{Fore.YELLOW}[WARN] Batch download: {stderr.splitlines()[-1]}")
+
+    return done
+
+# Upload the small files in one tar stream -> the relative paths that done, None if the server can't
+def tar_upload(sftp, local_root: str, remote_root: str, relatives: Iterable[str], compression: str = "none", level: int = 1,
+               throttle=None) -> Optional[list[str]]:
+
+    key = id(sftp.transport)
+    relatives = list(relatives)
+    _, extract, compressor, _ = _codec(compression, level)
+
+    # Every file is extracted as partial, and renamed when the whole tar is there
+    # The list of the names come last, without it tar is not there, or extracted nothing
+    names = f".vsfs-batch-{uuid.uuid4().hex}{partial_suffix}"
+    rename = "xargs -0 sh -c 'for f; do mv -f -- \"$f" + partial_suffix + "\" \"$f\" || failed=1; done; exit ${failed:-0}' _"
+    command = (f"cd {shlex.quote(remote_root)} && {{ tar --no-same-owner{extract} -xf -; status=$?; "
+               f"test -f {names} || exit {_not_extracted}; {rename} < {names}; renamed=$?; rm -f -- {names}; "
+               f"[ $status -ne 0 ] || status=$renamed; exit $status; }}")
+
+    try:
+        channel = _exec(sftp, command)
+
+    # No free session now, only this batch go one by one
+    except ChannelException:
+
+        return None
+
+    except Exception:
+        _tar_supported[key] = False
+
+        return None
+
+    try:
+        stream = channel.makefile("wb")
+
+        # The compressed bytes is what go on the wire
+        if throttle:
+            stream = Throttled(stream, throttle)
+
+        if compressor:
+            stream = _CompressWriter(stream, compressor())
+
+        with tarfile.open(fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT) as archive:
+            for relative in relatives:
+                archive.add(os.path.join(local_root, relative), arcname=relative + partial_suffix, recursive=False)
+
+            # The list of the names to rename, last in the archive
+            listing = b"".join(os.fsencode(relative) + b"\0" for relative in relatives)
+            info = tarfile.TarInfo(names)
+            info.size = len(listing)
+            archive.addfile(info, io.BytesIO(listing))
+
+        # tarfile don't close the stream that given, push the rest out
+        stream.close()
+
+        channel.shutdown_write()
+
+    except (OSError, tarfile.TarError):
+        channel.close()
+
+        raise
+
+    status, stderr = _finish(channel)
+
+    # No tar, or a tar that don't know the options, the files go one by one from now
+    if status == _not_extracted:
+        print(f"{Fore.YELLOW}[WARN] Batch upload: {stderr or f'exit {status}'}, copy the files one by one")
+        _tar_supported[key] = False
+
+        return None
+
+    _tar_supported[key] = True
+
+    # One file that can't be written, only this batch go one by one, the file that done is copied again
+    if status != 0:
+        print(f"{Fore.YELLOW}[WARN] Batch upload: {stderr.splitlines()[-1] if stderr else f'exit {status}'}, copy this batch one by one")
+
+        return None
+
+    return relatives
@@ -0,0 +1,130 @@
+import shlex
+import hashlib
+from typing import Callable, Dict, Optional
+
+"""----------------------------
+||| The Checksum Function |||
+----------------------------"""
+
+# Read size for hashing, same as the copy buffer
+chunk_size: int = 1024 * 1024
+
+# The remote method that work, per transport -> "check-file", "exec", or "read"
+_remote_method: Dict[int, str] = {}
+
+# Hash the local file with sha256
+def hash_local(path: str) -> str:
+
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+# Hash on server side with "check-file" extension
+def _hash_check_file(sftp, path: str) -> str:
+
+    with sftp.sftp.open(path, "rb") as file:
+
+        return file.check("sha256", 0, 0, 0).hex()
+
+# Hash on server side with sha256sum over the exec channel
+def _hash_exec(sftp, path: str) -> str:
+
+    channel = sftp.transport.open_session()
+
+    try:
+        channel.exec_command(f"sha256sum -- {shlex.quote(path)}")
+        output = channel.makefile("rb").read().decode()
+
+        if channel.recv_exit_status() != 0 or not output:
+            raise IOError(f"sha256sum failed on {path}")
+
+        # sha256sum put a backslash in front, when the file name is odd
+        return output.split()[0].lstrip("\\")
+
+    finally:
+        channel.close()
+
+# Hash by reading the file through SFTP, the slowest one
+def _hash_read(sftp, path: str) -> str:
+
+    digest = hashlib.sha256()
+
+    with sftp.sftp.open(path, "rb") as file:
+        file.prefetch()
+
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+_remote_hashers: Dict[str, Callable] = {
+    "check-file": _hash_check_file,
+    "exec": _hash_exec,
+    "read": _hash_read,
+}
+
+# Hash the server file, with the fastest method that the server have
+def hash_remote(sftp, path: str) -> str:
+
+    key = id(sftp.transport)
+    method = _remote_method.get(key)
+
+    if method is not None:
+
+        return _remote_hashers[method](sftp, path)
+
+    # Try the method one by one, and remember the first that work
+    for method in ("check-file", "exec"):
+
+        try:
+            digest = _remote_hashers[method](sftp, path)
+            _remote_method[key] = method
+
+            return digest
+
+        except Exception:
+
+            continue
+
+    _remote_method[key] = "read"
+
+    return _hash_read(sftp, path)
+
+# Hashes of the files, reuse the saved hash while (size, mtime) is not change
+class HashCache:
+
+    # cached -> {side: {Relative path: (size, mtime, hash)}}
+    def __init__(self, cached: Optional[Dict[str, Dict[str, tuple]]] = None):
+        self.hashes: Dict[str, Dict[str, tuple]] = {side: dict(entries) for side, entries in (cached or {}).items()}
+
+    # Return the hash of one path, compute() is only call if the cache is old
+    def get(self, side: str, relative: str, size: int, mtime: float, compute: Callable[[], str]) -> str:
+
+        entries = self.hashes.setdefault(side, {})
+        cached = entries.get(relative)
+
+        if cached is not None and cached[0] == size and int(cached[1]) == int(mtime):
+
+            return cached[2]
+
+        digest = compute()
+        entries[relative] = (size, mtime, digest)
+
+        return digest
+
+    # Return as {Relative path: hash} that still match the entries
+    def valid(self, side: str, entries: dict) -> Dict[str, str]:
+
+        result = {}
+
+        for relative, (size, mtime, digest) in self.hashes.get(side, {}).items():
+            info = entries.get(relative)
+
+            if info is not None and info[0] == size and int(info[1]) == int(mtime):
+                result[relative] = digest
+
+        return result
@@ -0,0 +1,193 @@
+import os
+import shlex
+import shutil
+import hashlib
+from typing import Optional
+from core.resume import partial_suffix
+
+"""-------------------------
+||| The Delta Function |||
+-------------------------"""
+
+# sha256 is the digest of every block, on both side
+digest_size: int = 32
+
+# Python script that hash every block on server side, when there is no "check-file"
+_remote_script = (
+    "import sys, hashlib\n"
+    "f = open(sys.argv[1], 'rb')\n"
+    "n = int(sys.argv[2])\n"
+    "for b in iter(lambda: f.read(n), b''):\n"
+    "    print(hashlib.sha256(b).hexdigest())\n"
+)
+
+# Hash every block of the local file
+def block_hashes_local(path: str, block_size: int) -> list[bytes]:
+
+    with open(path, "rb") as file:
+
+        return [hashlib.sha256(block).digest() for block in iter(lambda: file.read(block_size), b"")]
+
+# Hash every block of the server file -> None, if server can't do it
+def block_hashes_remote(sftp, path: str, block_size: int) -> Optional[list[bytes]]:
+
+    # The "check-file" extension, no need a shell
+    try:
+        with sftp.sftp.open(path, "rb") as file:
+            data = file.check("sha256", 0, 0, block_size)
+
+        return [data[i:i + digest_size] for i in range(0, len(data), digest_size)]
+
+    except Exception:
+
+        pass
+
+    # Or the python on the server, over exec channel
+    try:
+        channel = sftp.transport.open_session()
+
+        try:
+            channel.exec_command(f"python3 -c {shlex.quote(_remote_script)} {shlex.quote(path)} {block_size}")
+            output = channel.makefile("rb").read().decode()
+
+            if channel.recv_exit_status() != 0:
+
+                return None
+
+            return [bytes.fromhex(line) for line in output.split()]
+
+        finally:
+            channel.close()
+
+    except Exception:
+
+        return None
+
+# The (offset, length) of every block that not the same
+def changed_blocks(source: list[bytes], target: list[bytes], size: int, block_size: int) -> list[tuple[int, int]]:
+
+    ranges = []
+
+    for index, digest in enumerate(source):
+        if index < len(target) and target[index] == digest:
+
+            continue
+
+        offset = index * block_size
+        ranges.append((offset, min(block_size, size - offset)))
+
+    return ranges
+
+# Copy the server file next to it, on the server -> False, if the server can't run cp
+def _copy_remote(sftp, path: str, copy: str) -> bool:
+
+    try:
+        channel = sftp.transport.open_session()
+
+        try:
+            channel.exec_command(f"cp -- {shlex.quote(path)} {shlex.quote(copy)}")
+
+            return channel.recv_exit_status() == 0
+
+        finally:
+            channel.close()
+
+    except Exception:
+
+        return False
+
+# Patch the local file to the server file, return the bytes read -> None, if delta can't use
+# The patch go to the partial copy, and replace the file at once, the dropped link never leave the half patched file
+def delta_download(sftp, remote_path: str, local_path: str, size: int, block_size: int, throttle=None) -> Optional[int]:
+
+    source = block_hashes_remote(sftp, remote_path, block_size)
+
+    if source is None:
+
+        return None
+
+    target = block_hashes_local(local_path, block_size)
+    ranges = changed_blocks(source, target, size, block_size)
+    partial = local_path + partial_suffix
+    shutil.copy(local_path, partial)
+
+    try:
+        with sftp.sftp.open(remote_path, "rb") as remote, open(partial, "r+b") as local:
+
+            # readv ask all the blocks at once, and give them in order
+            for (offset, length), data in zip(ranges, remote.readv(ranges)):
+                if throttle:
+                    throttle(length)
+
+                local.seek(offset)
+                local.write(data)
+
+            local.truncate(size)
+
+        os.replace(partial, local_path)
+
+    except Exception:
+
+        try:
+            os.remove(partial)
+
+        except OSError:
+
+            pass
+
+        raise
+
+    return sum(length for _, length in ranges)
+
+# Patch the server file to the local file, return the bytes written -> None, if delta can't use
+def delta_upload(sftp, local_path: str, remote_path: str, size: int, block_size: int, throttle=None) -> Optional[int]:
+
+    target = block_hashes_remote(sftp, remote_path, block_size)
+
+    if target is None:
+
+        return None
+
+    source = block_hashes_local(local_path, block_size)
+    ranges = changed_blocks(source, target, size, block_size)
+    partial = remote_path + partial_suffix
+
+    # The patch need the copy on server, without cp the whole file is copied, it's done in the partial too
+    if not _copy_remote(sftp, remote_path, partial):
+
+        return None
+
+    try:
+        with open(local_path, "rb") as local, sftp.sftp.open(partial, "r+b") as remote:
+            remote.set_pipelined(True)
+
+            for offset, length in ranges:
+                if throttle:
+                    throttle(length)
+
+                local.seek(offset)
+                remote.seek(offset)
+                remote.write(local.read(length))
+
+            remote.truncate(size)
+
+        # Replace the old file at once, posix-rename if server have it
+        try:
+            sftp.sftp.posix_rename(partial, remote_path)
+
+        except IOError:
+            sftp.sftp.remove(remote_path)
+            sftp.sftp.rename(partial, remote_path)
+
+    except Exception:
+
+        try:
+            sftp.sftp.remove(partial)
+
+        except Exception:
+
+            pass
+
+        raise
+
+    return sum(length for _, length in ranges)
@@ -0,0 +1,103 @@
+import stat
+import threading
+import posixpath
+from typing import Iterable, Mapping, Optional
+from colorama import Fore, Style
+
+"""---------------------------------
+||| The Remote Directory Function |||
+---------------------------------"""
+
+# Remember which server directory is there, so every file don't ask the server again
+class RemoteDirs:
+
+    # entries -> {Relative path: info with .mode}, the server listing of this run
+    # Without the listing, the unknown directory is check with stat once
+    def __init__(self, root: str, entries: Optional[Mapping] = None):
+        self.root = root
+        self.entries = entries
+        self.known: set[str] = {""}
+        self.lock = threading.Lock()
+
+    # Check one directory from the listing -> True is dir, False is file, None is not there / unknown
+    def _listed(self, relative: str) -> Optional[bool]:
+
+        info = self.entries.get(relative) if self.entries is not None else None
+
+        if info is None:
+
+            return None
+
+        return stat.S_ISDIR(info.mode)
+
+    # Check one directory on the server -> same as _listed
+    def _stat(self, sftp, remote_dir: str) -> Optional[bool]:
+
+        try:
+
+            return stat.S_ISDIR(sftp.sftp.stat(remote_dir).st_mode)
+
+        except FileNotFoundError:
+
+            return None
+
+    # Create one directory, the parent is already there
+    def _mkdir(self, sftp, relative: str) -> None:
+
+        remote_dir = posixpath.join(self.root, relative)
+        found = self._listed(relative)
+
+        if found is None and self.entries is None:
+            found = self._stat(sftp, remote_dir)
+
+        if found:
+
+            return
+
+        if found is False:
+            print(f"{Fore.RED}[CONFLICT] Removing file blocking directory: {remote_dir}")
+            sftp.remove(remote_dir)
+
+        try:
+            sftp.sftp.mkdir(remote_dir)
+            print(f"{Fore.YELLOW}{Style.BRIGHT}[CREATE DIR]{Style.RESET_ALL} -> {remote_dir}")
+
+        except IOError:
+
+            # Other client can make it first, the server only say "Failure"
+            if not self._stat(sftp, remote_dir):
+                raise
+
+    # Make sure the relative directory is there, and all the parent
+    def ensure(self, sftp, relative: str) -> None:
+
+        relative = relative.strip("/")
+
+        if relative in self.known:
+
+            return
+
+        with self.lock:
+
+            # Parent first, stop at the first one that already known
+            missing = []
+
+            while relative not in self.known:
+                missing.append(relative)
+                relative = posixpath.dirname(relative)
+
+            for relative in reversed(missing):
+                self._mkdir(sftp, relative)
+                self.known.add(relative)
+
+    # Make all the directories up front, parent before child
+    def prepare(self, sftp, relatives: Iterable[str]) -> None:
+
+        for relative in sorted(set(relatives), key=lambda path: (path.count("/"), path)):
+
+            # The file in it report the error again, when it's upload
+            try:
+                self.ensure(sftp, relative)
+
+            except Exception as e:
+                print(f"{Fore.RED}[ERROR] Failed to create dir {posixpath.join(self.root, relative)}: {e}")
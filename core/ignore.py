@@ -0,0 +1,272 @@
+import re
+import hashlib
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+"""---------------------------
+||| The Ignore Rule Function |||
+---------------------------"""
+
+# The rule file at the root of the synced tree, it's synced too so both side ignore the same
+ignore_file: str = ".vsfsignore"
+
+# The glob character, and the escape
+_wildcard = re.compile(r"[*?\[\\]")
+
+# "*.sw[po]" -> [".swp", ".swo"], the name suffixes of the glob -> None, if it's not only "*" then the literal and the small class
+def _suffixes(pattern: str) -> Optional[list[str]]:
+
+    if not pattern.startswith("*"):
+
+        return None
+
+    options = [""]
+    i = 1
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        if char == "[":
+            end = pattern.find("]", i + 2)
+            body = pattern[i + 1:end] if end > 0 else ""
+
+            if not body or body[0] in "!^" or "-" in body or "\\" in body:
+
+                return None
+
+            options = [option + each for option in options for each in body]
+            i = end + 1
+
+        elif char in "*?\\":
+
+            return None
+
+        else:
+            options = [option + char for option in options]
+            i += 1
+
+        if len(options) > 16:
+
+            return None
+
+    return options
+
+# One gitignore glob -> regex of the relative path, "/" is never matched by * or ?
+def _translate(pattern: str) -> str:
+
+    result = []
+    i, n = 0, len(pattern)
+
+    while i < n:
+        char = pattern[i]
+
+        if pattern.startswith("**/", i):
+            result.append("(?:.*/)?")
+            i += 3
+
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            result.append("/.*")
+            i += 3
+
+        elif pattern.startswith("**", i):
+            result.append(".*")
+            i += 2
+
+        elif char == "*":
+            result.append("[^/]*")
+            i += 1
+
+        elif char == "?":
+            result.append("[^/]")
+            i += 1
+
+        elif char == "[" and pattern.find("]", i + 2) > 0:
+            end = pattern.find("]", i + 2)
+            body = pattern[i + 1:end].replace("\\", "\\\\")
+
+            if body[0] in "!^":
+                body = "^" + body[1:]
+
+            result.append(f"[{body}]")
+            i = end + 1
+
+        elif char == "\\" and i + 1 < n:
+            result.append(re.escape(pattern[i + 1]))
+            i += 2
+
+        else:
+            result.append(re.escape(char))
+            i += 1
+
+    return "".join(result)
+
+# One kind of the entry (file or directory) -> the literal names, the "*.ext" suffixes, the name globs, and the path globs
+# Every part give the index of the last rule that match, and the usual rules never get to the regex
+class _Matcher:
+
+    def __init__(self, rules: list[tuple[int, str, bool]]):
+        self.names: dict[str, int] = {}
+        self.suffixes: dict[str, int] = {}
+        name_globs, path_globs, prefixes = [], [], []
+
+        for index, pattern, anchored in rules:
+            if not anchored and not _wildcard.search(pattern):
+                self.names[pattern] = index
+
+            elif not anchored and _suffixes(pattern):
+                for suffix in _suffixes(pattern):
+                    self.suffixes[suffix] = max(index, self.suffixes.get(suffix, -1))
+
+            elif not anchored:
+                name_globs.append(f"(?P<r{index}>{_translate(pattern)})")
+
+            else:
+                path_globs.append(f"(?P<r{index}>{_translate(pattern)})")
+                prefixes.append(_wildcard.split(pattern, 1)[0])
+
+        self.suffix_tuple = tuple(self.suffixes)
+
+        # Reverse order, so the first alternative that match is the last rule
+        self.name_regex = re.compile("|".join(reversed(name_globs)), re.DOTALL) if name_globs else None
+        self.path_regex = re.compile("|".join(reversed(path_globs)), re.DOTALL) if path_globs else None
+
+        # The literal start of the anchored rules, most path don't start with any of them
+        self.prefixes = tuple(prefixes)
+
+    # The anchored rules can match under the directory, prefix is "dir/" or "" for the root
+    def reach(self, prefix: str) -> bool:
+
+        return self.path_regex is not None and any(start.startswith(prefix) or prefix.startswith(start) for start in self.prefixes)
+
+    # The index of the last rule that match the name -> -1, if nothing match
+    def match_name(self, name: str) -> int:
+
+        index = self.names.get(name, -1)
+
+        if self.suffix_tuple and name.endswith(self.suffix_tuple):
+            index = max(index, max(rule for suffix, rule in self.suffixes.items() if name.endswith(suffix)))
+
+        if self.name_regex is not None:
+            found = self.name_regex.fullmatch(name)
+
+            if found is not None:
+                index = max(index, int(found.lastgroup[1:]))
+
+        return index
+
+    # The index of the last rule that match the relative path -> -1, if nothing match
+    def match(self, relative: str) -> int:
+
+        index = self.match_name(relative[relative.rfind("/") + 1:])
+
+        if self.path_regex is not None and relative.startswith(self.prefixes):
+            found = self.path_regex.fullmatch(relative)
+
+            if found is not None:
+                index = max(index, int(found.lastgroup[1:]))
+
+        return index
+
+# gitignore style rules, compiled once for the file and once for the directory
+# The last rule that match win, "!" include it again, "/" at the end only match the directory,
+# "/" at the start or in the middle anchor it at the root, and the other match the name at any depth
+class IgnoreRules:
+
+    def __init__(self, lines: Iterable[str]):
+        self.rules: list[tuple[str, bool, bool, bool]] = []
+        digest = hashlib.sha1()
+
+        for line in lines:
+            line = line.rstrip("\r\n").rstrip()
+
+            if not line or line.startswith("#"):
+
+                continue
+
+            digest.update(line.encode() + b"\n")
+            negate = line.startswith("!")
+            line = line[1:] if negate else line
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+
+            if line:
+                self.rules.append((line, negate, dir_only, anchored))
+
+        # Changed rules need the full walk, the pruned directory don't know the newly included entry
+        self.digest = digest.hexdigest() if self.rules else ""
+        self.negated = any(negate for _, negate, _, _ in self.rules)
+
+        indexed = [(index, pattern, anchored) for index, (pattern, _, _, anchored) in enumerate(self.rules)]
+        self._file = _Matcher([rule for rule, (_, _, dir_only, _) in zip(indexed, self.rules) if not dir_only])
+        self._dir = _Matcher(indexed)
+
+    def __bool__(self) -> bool:
+
+        return bool(self.rules)
+
+    # Check the relative path is ignored, the walker never go into the ignored directory
+    def ignored(self, relative: str, is_dir: bool = False) -> bool:
+
+        index = (self._dir if is_dir else self._file).match(relative)
+
+        return index >= 0 and not self.rules[index][1]
+
+    # The check for the entries of one directory -> check(name, is_dir), the part of the path is only done once
+    # The walker list directory by directory, so the most entries only cost the name lookup
+    def for_dir(self, relative: str = "") -> Callable[[str, bool], bool]:
+
+        prefix = f"{relative}/" if relative else ""
+        file_path = self._file.reach(prefix)
+        dir_path = self._dir.reach(prefix)
+        rules = self.rules
+
+        def _ignored(name: str, is_dir: bool = False) -> bool:
+
+            matcher = self._dir if is_dir else self._file
+            index = matcher.match_name(name)
+
+            if dir_path if is_dir else file_path:
+                found = matcher.path_regex.fullmatch(prefix + name)
+
+                if found is not None:
+                    index = max(index, int(found.lastgroup[1:]))
+
+            return index >= 0 and not rules[index][1]
+
+        return _ignored
+
+    # The find expression that prune the ignored name -> None, if the rules can't be said with -name
+    # It's only a shortcut, the listing still check every path with ignored()
+    def find_prune(self) -> Optional[list[str]]:
+
+        if self.negated:
+
+            return None
+
+        tests = []
+
+        for pattern, _, dir_only, anchored in self.rules:
+            if anchored or "\\" in pattern or "**" in pattern:
+
+                continue
+
+            tests.append(["-type", "d", "-name", pattern] if dir_only else ["-name", pattern])
+
+        if not tests:
+
+            return None
+
+        expression = ["("]
+
+        for test in tests:
+            expression += (["-o"] if len(expression) > 1 else []) + test
+
+        return expression + [")", "-prune", "-o"]
+
+# Compile the rules once for the same text
+@lru_cache(maxsize=8)
+def compile_rules(lines: tuple[str, ...]) -> IgnoreRules:
+
+    return IgnoreRules(lines)
@@ -0,0 +1,181 @@
+import sys
+import threading
+from array import array
+from collections.abc import MutableMapping
+from typing import Iterator, NamedTuple, Optional
+
+"""-------------------------
+||| The File Index Class |||
+-------------------------"""
+
+# Size, mtime, and mode of one entry
+class files_info(NamedTuple):
+    size: int
+    mtime: float
+    mode: int
+
+# The mode of the parent that only made for the path, or the deleted entry
+_absent: int = -1
+
+# The root directory, parent of the top level entries
+_root: int = -1
+
+# {Relative path: files_info} that keep every entry as one id in the name map of the parent directory
+# The name is interned, and the numbers are in array, so a million entries don't need a million tuple and path string
+class FileIndex(MutableMapping):
+
+    __slots__ = ("sizes", "mtimes", "modes", "children", "count", "lock")
+
+    def __init__(self, entries=None):
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.modes = array("q")
+
+        # Only the directory have children -> {Parent id: {Name: id}}
+        self.children: dict[int, dict[str, int]] = {_root: {}}
+        self.count = 0
+        self.lock = threading.Lock()
+
+        if entries is not None:
+            self.update(entries)
+
+    # The id of the path -> None, if it's not there
+    def _find(self, path: str) -> Optional[int]:
+
+        node = _root
+
+        for name in path.split("/"):
+            children = self.children.get(node)
+
+            if children is None:
+
+                return None
+
+            node = children.get(name)
+
+            if node is None:
+
+                return None
+
+        return node
+
+    # Add one name under the parent, the arrays first so the reader never see half of it
+    def _add(self, parent: int, name: str, size: int, mtime: float, mode: int) -> int:
+
+        node = len(self.sizes)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.modes.append(mode)
+        self.children.setdefault(parent, {})[sys.intern(name)] = node
+
+        return node
+
+    def __getitem__(self, path: str) -> files_info:
+
+        node = self._find(path)
+
+        if node is None or self.modes[node] == _absent:
+            raise KeyError(path)
+
+        return files_info(self.sizes[node], self.mtimes[node], self.modes[node])
+
+    def __setitem__(self, path: str, info) -> None:
+
+        size, mtime, mode = info
+
+        with self.lock:
+            names = path.split("/")
+            parent = _root
+
+            # Make the parent that not listed yet, it's fill when the parent is set
+            for name in names[:-1]:
+                node = self.children.setdefault(parent, {}).get(name)
+                parent = self._add(parent, name, 0, 0.0, _absent) if node is None else node
+
+            node = self.children.setdefault(parent, {}).get(names[-1])
+
+            if node is None:
+                self._add(parent, names[-1], size, mtime, mode)
+                self.count += 1
+
+                return
+
+            if self.modes[node] == _absent:
+                self.count += 1
+
+            self.sizes[node] = size
+            self.mtimes[node] = mtime
+            self.modes[node] = mode
+
+    # The entry only marked, the children under it stay
+    def __delitem__(self, path: str) -> None:
+
+        with self.lock:
+            node = self._find(path)
+
+            if node is None or self.modes[node] == _absent:
+                raise KeyError(path)
+
+            self.modes[node] = _absent
+            self.count -= 1
+
+    def __contains__(self, path) -> bool:
+
+        node = self._find(path)
+
+        return node is not None and self.modes[node] != _absent
+
+    def __len__(self) -> int:
+
+        return self.count
+
+    # Depth first, the path string only made while it's used
+    def __iter__(self) -> Iterator[str]:
+
+        stack = [(_root, "")]
+
+        while stack:
+            parent, prefix = stack.pop()
+
+            for name, node in self.children.get(parent, {}).items():
+                path = prefix + name
+
+                if self.modes[node] != _absent:
+
+                    yield path
+
+                if node in self.children:
+                    stack.append((node, path + "/"))
+
+    # The info of every entry, without making the path
+    def infos(self) -> Iterator[files_info]:
+
+        for size, mtime, mode in zip(self.sizes, self.mtimes, self.modes):
+            if mode != _absent:
+
+                yield files_info(size, mtime, mode)
+
+    # The entries in one directory -> [(name, files_info)] sorted by name
+    def listdir(self, path: str = "") -> list[tuple[str, files_info]]:
+
+        parent = self._find(path) if path else _root
+        entries = []
+
+        for name, node in self.children.get(parent, {}).items():
+            if self.modes[node] != _absent:
+                entries.append((name, files_info(self.sizes[node], self.mtimes[node], self.modes[node])))
+
+        entries.sort()
+
+        return entries
+
+    def copy(self) -> "FileIndex":
+
+        other = FileIndex()
+        other.sizes = array("q", self.sizes)
+        other.mtimes = array("d", self.mtimes)
+        other.modes = array("q", self.modes)
+        other.children = {parent: dict(children) for parent, children in self.children.items()}
+        other.count = self.count
+
+        return other
@@ -0,0 +1,125 @@
+import stat
+import shlex
+from typing import Dict, Optional
+from colorama import Fore
+from core.index import FileIndex, files_info
+from core.ignore import IgnoreRules
+from core.resume import is_partial
+
+"""-------------------------------------
+||| The Server Side Listing Function |||
+-------------------------------------"""
+
+# The server can run find over the exec channel, per transport
+_exec_supported: Dict[int, bool] = {}
+
+# One entry per NUL, the path is last so the tab and newline in the name are safe
+_find_format = r"%s\t%T@\t%m\t%y\t%P\0"
+
+# The find %y -> the file type bits of st_mode
+_file_types: Dict[str, int] = {
+    "f": stat.S_IFREG,
+    "d": stat.S_IFDIR,
+    "l": stat.S_IFLNK,
+    "p": stat.S_IFIFO,
+    "s": stat.S_IFSOCK,
+    "c": stat.S_IFCHR,
+    "b": stat.S_IFBLK,
+}
+
+# Read size of the find output
+chunk_size: int = 256 * 1024
+
+# Add one find record to the index
+# excluded is the ignored directories, find list the directory before the entries in it
+# checks is the ignore check of the recent directories, find come back to the parent after the sub-dir
+def _parse(result: FileIndex, record: bytes, ignore: Optional[IgnoreRules], excluded: set[str], checks: dict) -> None:
+
+    size, mtime, mode, kind, path = record.decode("utf-8", "surrogateescape").split("\t", 4)
+
+    if not path or is_partial(path.rsplit("/", 1)[-1]):
+
+        return
+
+    if ignore:
+        parent, _, name = path.rpartition("/")
+        ignored = checks.get(parent)
+
+        if ignored is None:
+            if len(checks) >= 1024:
+                checks.clear()
+
+            ignored = checks[parent] = ignore.for_dir(parent)
+
+        if parent in excluded or ignored(name, kind == "d"):
+            if kind == "d":
+                excluded.add(path)
+
+            return
+
+    mode = _file_types.get(kind, 0) | int(mode, 8)
+    result[path] = files_info(0 if kind == "d" else int(size), float(mtime), mode)
+
+# List the whole server tree with one find over the exec channel -> None, if the server can't
+# The ignored directory is pruned by find when the rules allow it, and skipped here anyway
+def exec_listing(sftp, root: str, ignore: Optional[IgnoreRules] = None) -> Optional[FileIndex]:
+
+    key = id(sftp.transport)
+
+    if _exec_supported.get(key) is False:
+
+        return None
+
+    result = FileIndex()
+    excluded: set[str] = set()
+    checks: dict = {}
+    prune = ignore.find_prune() if ignore else None
+    prune = " ".join(shlex.quote(word) for word in prune) + " " if prune else ""
+
+    try:
+        channel = sftp.transport.open_session()
+
+        try:
+            channel.exec_command(f"find {shlex.quote(root)} -mindepth 1 {prune}-printf '{_find_format}'")
+            buffer = b""
+            stderr = b""
+
+            # Parse while it's streaming, only the last unfinished record is kept
+            for chunk in iter(lambda: channel.recv(chunk_size), b""):
+                records = (buffer + chunk).split(b"\0")
+                buffer = records.pop()
+
+                for record in records:
+                    _parse(result, record, ignore, excluded, checks)
+
+                while channel.recv_stderr_ready():
+                    stderr += channel.recv_stderr(chunk_size)
+
+            status = channel.recv_exit_status()
+
+            while channel.recv_stderr_ready():
+                stderr += channel.recv_stderr(chunk_size)
+
+        finally:
+            channel.close()
+
+    except Exception as e:
+        print(f"{Fore.YELLOW}[WARN] Server side listing failed: {e}, use the SFTP walk")
+        _exec_supported[key] = False
+
+        return None
+
+    # No find, or find without -printf
+    if status != 0 and not result:
+        _exec_supported[key] = False
+
+        return None
+
+    # Some directory can't be read, same as the SFTP walk it's skipped
+    if status != 0:
+        for line in stderr.decode(errors="replace").splitlines():
+            print(f"{Fore.RED}[ERROR] walking to server tree: {line}")
+
+    _exec_supported[key] = True
+
+    return result
@@ -1,19 +1,114 @@
 import os
 import sys
+import json
 import stat
+import time
+import threading
 import paramiko
+from itertools import chain
+from fnmatch import fnmatch
+from functools import lru_cache
+from concurrent.futures import Future
 from pathlib import Path
 from datetime import datetime
+from config import config as vsfs_config
 from config.config import server_location, client_location, user_config, sftp_config
-from typing import Dict
+from core.transfer import run_transfers, run_breadth_first, ChannelExecutor
+from core.state import SyncState, SERVER, CLIENT
+from core.checksum import HashCache, hash_local, hash_remote
+from core.delta import delta_download, delta_upload
+from core.pool import SFTPPool
+from core.resume import resumable_get, resumable_put, is_partial
+from core.dircache import RemoteDirs
+from core.index import FileIndex, files_info
+from core.scan import scan_dir, scan_tree
+from core.watch import watch
+from core.listing import exec_listing
+from core.batch import tar_download, tar_upload, compressible, supported as tar_supported
+from core.throttle import TokenBucket, scheduled_limit, prioritized
+from core.ignore import IgnoreRules, compile_rules, ignore_file
+from core.moves import MoveDetector
+from core.prune import DeletePlan, exec_delete, sftp_delete, local_delete
+from core.plan import summarize, measure_link, build_plan, render
+from typing import Dict, MutableMapping
 from colorama import Fore, Style, init
 
 # Intialise colourama to reset color
 init(autoreset=True)
 
-# Global declaration
-files_info = int         # For size, and mtime
-files_map = Dict[str, int]       # For Relative paths -> Information
+# Global declaration, files_info is the (size, mtime, and mode)
+files_map = MutableMapping[str, files_info]       # For Relative paths -> Information, a FileIndex or dict
+
+# Optional settings, the older config.py don't have it
+transfer_workers: int = getattr(vsfs_config, "transfer_workers", 4)
+walk_workers: int = getattr(vsfs_config, "walk_workers", 8)
+scan_workers: int = getattr(vsfs_config, "scan_workers", 1)
+
+# The worker channels kept open after the work, every channel is one session of the server, the same as the exec
+idle_channels: int = getattr(vsfs_config, "idle_channels", 2)
+server_listing: str = getattr(vsfs_config, "server_listing", "auto")
+
+# [auto] Delete the listed server paths with rm over SSH exec, and SFTP if the server can't, [tree] rm -rf the whole deleted directory
+# [sftp] Always SFTP, delete_workers channels at same time, the rm commands at same time are limited to the free sessions too
+delete_mode: str = getattr(vsfs_config, "delete_mode", "auto")
+delete_workers: int = getattr(vsfs_config, "delete_workers", 8)
+
+# The sessions the server allow on one connection, the MaxSessions of OpenSSH is 10 by default
+max_sessions: int = getattr(vsfs_config, "max_sessions", 10)
+compare_mode: str = getattr(vsfs_config, "compare_mode", "mtime")
+delta_threshold: int = getattr(vsfs_config, "delta_threshold", 64 * 1024 * 1024)
+delta_block_size: int = getattr(vsfs_config, "delta_block_size", 128 * 1024)
+keepalive_interval: int = getattr(vsfs_config, "keepalive_interval", 30)
+
+# The file smaller than batch_threshold (bytes) copy in one tar stream over SSH exec, 0 copy every file alone
+batch_threshold: int = getattr(vsfs_config, "batch_threshold", 64 * 1024)
+batch_files: int = getattr(vsfs_config, "batch_files", 256)
+batch_bytes: int = getattr(vsfs_config, "batch_bytes", 8 * 1024 * 1024)
+
+# Compress the whole SSH connection, and the batch tar stream with "gz" or "xz" (the already compressed file is skipped)
+ssh_compression: bool = getattr(vsfs_config, "ssh_compression", False)
+batch_compression: str = getattr(vsfs_config, "batch_compression", "none")
+compression_level: int = getattr(vsfs_config, "compression_level", 1)
+
+# Bandwidth limit in bytes per second, shared by every transfer of the direction, 0 is not limited
+# limit_schedule is [("09:00", "18:00", upload limit, download limit)], the first window that match win
+upload_limit: int = getattr(vsfs_config, "upload_limit", 0)
+download_limit: int = getattr(vsfs_config, "download_limit", 0)
+limit_schedule: list = getattr(vsfs_config, "limit_schedule", [])
+
+# The copy order, [small] the small file first, [found] as the walk find it, and the transfer_first globs before the rest
+transfer_order: str = getattr(vsfs_config, "transfer_order", "small")
+transfer_first: list = getattr(vsfs_config, "transfer_first", [])
+transfer_window: int = getattr(vsfs_config, "transfer_window", 1000)
+
+# gitignore style patterns that never walked nor copied, added before the .vsfsignore of the tree root
+ignore_patterns: list = getattr(vsfs_config, "ignore_patterns", [])
+
+# The file moved on one side is renamed on the other side, paired by (size, mtime), the file smaller than move_min_size is just copied
+# The empty file is never paired, every one of them look the same
+# move_checksum check the pair by the content hash too, the hash of the last sync is used while it's still valid
+detect_moves: bool = getattr(vsfs_config, "detect_moves", True)
+move_min_size: int = getattr(vsfs_config, "move_min_size", 1)
+move_checksum: bool = getattr(vsfs_config, "move_checksum", False)
+
+# Tuning for the long fat pipe, the paramiko default is 2 MB window
+window_size: int = getattr(vsfs_config, "window_size", 16 * 1024 * 1024)
+max_packet_size: int = getattr(vsfs_config, "max_packet_size", 32 * 1024)
+sftp_request_size: int = getattr(vsfs_config, "sftp_request_size", 32 * 1024)
+prefetch_requests: int = getattr(vsfs_config, "prefetch_requests", 128)
+buffer_size: int = getattr(vsfs_config, "buffer_size", 1024 * 1024)
+
+# Don't list the server directory that not changed, and list everything every N seconds, 0 always list everything
+# The file that changed in place don't change the directory mtime, it's only seen on the full rescan
+full_rescan_interval: int = getattr(vsfs_config, "full_rescan_interval", 0)
+
+# Watch mode, push after N seconds without new change, and the full sync every N seconds
+watch_debounce: float = getattr(vsfs_config, "watch_debounce", 0.5)
+watch_reconcile_interval: int = getattr(vsfs_config, "watch_reconcile_interval", 3600)
+watch_delete: bool = getattr(vsfs_config, "watch_delete", True)
+
+# The sync state database, saved next to config.py
+state_file: Path = Path(vsfs_config.__file__).parent / "state.db"
 
 """---------------------- 
 ||| The SFTP Function |||
@@ -23,12 +118,32 @@ files_map = Dict[str, int]       # For Relative paths -> Information
 class SFTP:
     
     # Manage the SFTP connection cycle
-    def __init__(self):
+    def __init__(self, transport: paramiko.Transport = None):
         self.sftp = None
         self.transport = None
+        self.owns_transport = transport is None
+        
+        # The worker channels that not used now, ready for the next worker, and every worker channel that open
+        self.idle: list["SFTP"] = []
+        self.opened = 0
+        self.lock = threading.Lock()
+        
+        # Only open new channel on the existed transport
+        if transport is not None:
+            self.transport = transport
+            self.sftp = paramiko.SFTPClient.from_transport(transport, window_size=window_size, max_packet_size=max_packet_size)
+            
+            return
         
         try:
-            self.transport = paramiko.Transport((sftp_config["host"], sftp_config["port"]))
+            self.transport = paramiko.Transport(
+                (sftp_config["host"], sftp_config["port"]),
+                default_window_size=window_size,
+                default_max_packet_size=max_packet_size
+            )
+            
+            # Must be set before the key exchange
+            self.transport.use_compression(ssh_compression)
             
             if "password" in sftp_config:
                 self.transport.connect(username=sftp_config["username"], password=sftp_config["password"])
@@ -41,7 +156,9 @@ class SFTP:
             else:
                 raise ValueError("No password or key provide for SFTP authentication")
             
-            self.sftp = paramiko.SFTPClient.from_transport(self.transport)
+            # Keep the idle session alive, between the menu actions
+            self.transport.set_keepalive(keepalive_interval)
+            self.sftp = paramiko.SFTPClient.from_transport(self.transport, window_size=window_size, max_packet_size=max_packet_size)
 
         except Exception as e:
             print(f"{Fore.RED}[ERROR] establishing SFTP connection: {e}")
@@ -50,6 +167,75 @@ class SFTP:
                 self.transport.close()
                 
             raise
+    
+    # Check the transport, and the channel are still open
+    def is_alive(self) -> bool:
+        
+        if self.transport is None or self.sftp is None:
+            
+            return False
+        
+        return self.transport.is_active() and not self.sftp.get_channel().closed
+    
+    # Give a SFTP channel that share this transport, reuse the idle one first
+    def channel(self) -> "SFTP":
+        
+        if self.transport is None:
+            raise RuntimeError("SFTP transport not initialized")
+        
+        with self.lock:
+            while self.idle:
+                channel = self.idle.pop()
+                
+                if channel.is_alive():
+                    
+                    return channel
+                
+                channel.close()
+                self.opened -= 1
+        
+        channel = SFTP(transport=self.transport)
+        
+        with self.lock:
+            self.opened += 1
+        
+        return channel
+    
+    # Give back the channel after the work, for the next worker, more than idle_channels are closed
+    def release(self, channel: "SFTP") -> None:
+        
+        if channel is self:
+            
+            return
+        
+        if channel.is_alive():
+            with self.lock:
+                if len(self.idle) < idle_channels:
+                    self.idle.append(channel)
+                    
+                    return
+        
+        channel.close()
+        
+        with self.lock:
+            self.opened -= 1
+    
+    # Close every idle channel, so the exec command have the sessions
+    def trim(self) -> None:
+        
+        with self.lock:
+            idle, self.idle = self.idle, []
+            self.opened -= len(idle)
+        
+        for channel in idle:
+            channel.close()
+    
+    # The sessions still free for the exec command, the main channel and every worker channel take one
+    def free_sessions(self) -> int:
+        
+        with self.lock:
+            
+            return max(max_sessions - 1 - self.opened, 1)
         
     # Remove files
     def remove(self, path) -> None:
@@ -86,12 +272,18 @@ class SFTP:
     # Closing sftp connection
     def close(self) -> None:
         
+        self.trim()
+        
         if self.sftp:
-            self.sftp.close
+            self.sftp.close()
         
-        if self.transport:
-            self.transport.close
+        # The channel don't close the shared transport
+        if self.transport and self.owns_transport:
+            self.transport.close()
             
+# The SFTP connection of this session, shared by every menu action
+pool = SFTPPool(SFTP)
+
 """-------------------------------
 ||| The Status Metada Function |||
 -------------------------------"""
@@ -126,237 +318,401 @@ def stat_client(path: Path):
 ||| The List Directory Function |||
 --------------------------------"""
 
+# The ignore rules -> ignore_patterns, then the .vsfsignore of client root, and of server root when sftp is given
+def load_ignore(sftp=None) -> IgnoreRules:
+    
+    texts: list[str] = []
+    
+    try:
+        texts.append((client_location / ignore_file).read_text(errors="replace"))
+    
+    except OSError:
+        
+        pass
+    
+    if sftp is not None:
+        
+        try:
+            with sftp.sftp.open(f"{str(server_location).rstrip('/')}/{ignore_file}", "r") as file:
+                text = file.read().decode(errors="replace")
+            
+            # Same file on both side after the first sync
+            if text not in texts:
+                texts.append(text)
+        
+        except IOError:
+            
+            pass
+    
+    lines = list(ignore_patterns)
+    
+    for text in texts:
+        lines += text.splitlines()
+    
+    # Compiled once for the same rules
+    return compile_rules(tuple(lines))
+
 # list server, and client function
-def list_server(sftp_manager) -> files_map:
+def list_server(sftp_manager, ignore: IgnoreRules = None) -> files_map:
     
     # Return as {Relative path: (size, mtime)} For every files and dir under server_location
     server_path: str = str(server_location).rstrip("/")
-    result: files_map = {}
+    ignore = load_ignore(sftp_manager) if ignore is None else ignore
+    
+    # One find over the exec channel, if the server allow it
+    if server_listing == "auto":
+        result = exec_listing(sftp_manager, server_path, ignore)
+        
+        if result is not None:
+            
+            return result
     
-    def _walk(server_dir: str) -> None:
+    result: files_map = FileIndex()
+    
+    # List one directory, and return the sub-dir to walk next
+    def _walk(sftp, server_dir: str) -> list[str]:
+        
+        subdirs = []
+        relative_dir = os.path.relpath(server_dir, server_path)
+        ignored = ignore.for_dir("" if relative_dir == "." else relative_dir) if ignore else None
+        
+        try:
+            entries = sftp.sftp.listdir_attr(server_dir)
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] walking to server tree: {server_dir}: {e}")
+            
+            return subdirs
         
-        for entry in sftp_manager.sftp.listdir_attr(server_dir):
+        for entry in entries:
+            
+            # Skip the unfinished copy
+            if is_partial(entry.filename):
+                
+                continue
+            
             remote_location = f"{server_dir}/{entry.filename}"
             relative = os.path.relpath(remote_location, server_path)
             
+            # The ignored directory is never listed
+            if ignored and ignored(entry.filename, stat.S_ISDIR(entry.st_mode)):
+                
+                continue
+            
             if stat.S_ISDIR(entry.st_mode):
-                result[relative] = 0
-                _walk(remote_location)
+                result[relative] = files_info(0, entry.st_mtime or 0, entry.st_mode)
+                subdirs.append(remote_location)
                 
             else:
-                result[relative] = entry.st_size
-            
-    try:
-        _walk(server_path)
+                result[relative] = files_info(entry.st_size, entry.st_mtime or 0, entry.st_mode)
+        
+        return subdirs
     
-    except Exception as e:
-        print(f"{Fore.RED}[ERROR] walking to server tree: {e}")
+    # Breadth first, every worker keep one listdir in flight on own channel
+    run_breadth_first(sftp_manager, [server_path], _walk, walk_workers)
         
     return result
         
-def list_client() -> files_map:
+def list_client(ignore: IgnoreRules = None) -> files_map:
     
     # Return as {Relative paths: (size, mtime)} For every files and dir under client_location
     client_path = client_location
-    result: files_map = {}
     
-    def _walk(client_dir: Path) -> None:
-        
-        for entry in client_dir.iterdir():
-            
-            relative: str = str(entry.relative_to(client_path))
-            
-            if entry.is_dir():
-                result[relative] = 0
-                _walk(entry)
-            
-            elif entry.is_file():
-                result[relative] = entry.stat().st_size
-                
     if client_path.exists():
-        _walk(client_path)
+        
+        # os.scandir, one stat per entry
+        return scan_tree(client_path, scan_workers, load_ignore() if ignore is None else ignore)
     
-    else:
-        print(f"Client base directory is missing: {client_path}")
+    print(f"Client base directory is missing: {client_path}")
     
-    return result    
+    return FileIndex()    
 
 """---------------------- 
 ||| The Copy Function |||
 ----------------------"""
 
-# Copy files from server to client
-def copy_server(sftp, download: list[str]) -> None:
+#Copy files from client to server
+def copy_client(sftp, upload: list[str], server_map: files_map = None) -> list[str]:
+
+    # Return the files that uploaded successfully
+    done: list[str] = []
+
+    # Show the live progress bar only when there is one worker
+    progress = transfer_workers <= 1
+    
+    # Make every server directory once, before the upload start
+    dirs = RemoteDirs(str(server_location), server_map)
+    dirs.prepare(sftp, (os.path.dirname(file) for file in upload if file.strip()))
     
-    if not download:
+    # Upload one file, or one batch of small files, one worker each
+    def _upload(sftp, item: tuple[str, str]) -> None:
         
-        return
+        _, file = item
+        
+        if isinstance(file, tuple):
+            done.extend(copy_batch(sftp, "upload", file, progress, dirs=dirs))
+        
+        elif upload_file(sftp, file, progress, dirs):
+            done.append(file)
+    
+    # The local size for the batching, and the order
+    @lru_cache(maxsize=1024)
+    def _info(action: str, file: str) -> files_info:
+        
+        try:
+            status = os.stat(client_location / file)
+        
+        except OSError:
+            
+            return None
+        
+        return files_info(status.st_size, status.st_mtime, status.st_mode)
+
+    items = batched(sftp, (("upload", file) for file in upload if file.strip()), _info)
+    run_transfers(sftp, ordered(items, _info), _upload, transfer_workers)
     
-    make_local_dir(download)
+    return done
+            
+# Group the small files into batches -> (action, relative), or (action, (relative, ...)) for one batch
+# info_of(action, relative) return the files_info, or None to copy it alone
+def batched(sftp, actions, info_of):
+    
+    # (action, compressible) -> the batch, the already compressed file go in own batch
+    batches: Dict[tuple[str, bool], list[str]] = {}
+    sizes: Dict[tuple[str, bool], int] = {}
     
-    # Make individual dir of server files
-    for file in download:
-        if not file.strip():
+    for action, relative in actions:
+        info = info_of(action, relative) if batch_threshold > 0 else None
+        
+        if info is None or not stat.S_ISREG(info.mode) or info.size >= batch_threshold or not tar_supported(sftp):
+            
+            yield action, relative
             
             continue
         
-        print(f"  → {file}")
-        remote_file = str(server_location / file)
-        local_file = client_location / file
-        local_dir = local_file.parent
+        key = (action, batch_compression != "none" and compressible(relative))
+        batch = batches.setdefault(key, [])
+        batch.append(relative)
+        sizes[key] = sizes.get(key, 0) + info.size
+        
+        if len(batch) >= batch_files or sizes[key] >= batch_bytes:
+            
+            yield action, tuple(batch)
+            
+            del batches[key], sizes[key]
+    
+    for (action, _), relatives in batches.items():
+        
+        yield action, tuple(relatives)
 
-        # Fix conflict files and dir
-        #_____________________________
+# The copy order of one item -> (rule, size), the first matched glob first, then the small file first
+def transfer_priority(item: tuple, info_of) -> tuple[int, int]:
+    
+    action, relative = item
+    name = relative[0] if isinstance(relative, tuple) else relative
+    rank = next((index for index, pattern in enumerate(transfer_first) if fnmatch(name, pattern)), len(transfer_first))
+    
+    # The batch is all small file, it go with the smallest
+    if transfer_order != "small" or isinstance(relative, tuple):
+        
+        return rank, 0
+    
+    info = info_of(action, relative)
+    
+    return rank, info.size if info else 0
 
-        if local_dir != client_location:
-            if local_dir.exists():
-                if local_dir.is_dir():
-                    
-                    pass
+# Reorder the items by transfer_priority, so most files land while the big one is still going
+def ordered(items, info_of):
+    
+    if transfer_order != "small" and not transfer_first:
+        
+        return items
+    
+    return prioritized(items, lambda item: transfer_priority(item, info_of), transfer_window)
+
+# Copy the small files in one tar stream, and the rest one by one -> the relative paths that done
+def copy_batch(sftp, action: str, relatives: tuple[str, ...], progress: bool, server_map: files_map = None, dirs: RemoteDirs = None) -> list[str]:
+    
+    # The batch is all compressible, or all not
+    compression = batch_compression if compressible(relatives[0]) else "none"
+    
+    try:
+        if action == "download":
+            done = tar_download(sftp, str(server_location), str(client_location), list(relatives), compression, compression_level, download_throttle)
+        
+        else:
+            done = tar_upload(sftp, str(client_location), str(server_location), relatives, compression, compression_level, upload_throttle)
+    
+    except Exception as e:
+        print(f"{Fore.RED}[WARN] Batch {action} failed: {e}, copy the files one by one")
+        done = None
+    
+    done = list(done or [])
+    
+    if done:
+        color = Fore.BLUE if action == "download" else Fore.GREEN
+        print(f"{color}{Style.BRIGHT}[BATCH]{Style.RESET_ALL} {action} {len(done)} files")
+    
+    # The server can't tar, or some file is missing from the stream
+    finished = set(done)
+    
+    for relative in relatives:
+        if relative in finished:
+            
+            continue
+        
+        if action == "download":
+            if download_file(sftp, relative, progress, server_map.get(relative) if server_map else None):
+                done.append(relative)
+        
+        elif upload_file(sftp, relative, progress, dirs):
+            done.append(relative)
+    
+    return done
+
+# Download one file from server to client, return True if it's done
+def download_file(sftp, file: str, progress: bool = True, info: files_info = None) -> bool:
+    
+    if not file.strip():
+        
+        return False
+    
+    print(f"  → {file}")
+    remote_file = str(server_location / file)
+    local_file = client_location / file
+    local_dir = local_file.parent
+
+    # Fix conflict files and dir
+    #_____________________________
+
+    if local_dir != client_location:
+        if local_dir.exists():
+            if local_dir.is_dir():
                 
-                else:
-                    # Conflict local_dir but is a file -> DELETE
-                    print(f"{Fore.RED}[CONFLICT] {local_dir} is FILE, removing and create {Fore.YELLOW}DIRECTORY")
-                    
-                    try:
-                        local_dir.unlink()
-                        
-                    except Exception as e:
-                        print(f"{Fore.RED}[FATAL] Cannot remove conflicting file {local_dir}: {e}")
-                    
-                    continue
-                   
+                pass
+            
             else:
+                # Conflict local_dir but is a file -> DELETE
+                print(f"{Fore.RED}[CONFLICT] {local_dir} is FILE, removing and create {Fore.YELLOW}DIRECTORY")
                 
                 try:
-                    is_directory(local_dir)
+                    local_dir.unlink()
                     
                 except Exception as e:
-                    print(f"{Fore.RED}[ERROR] Cannot create local dir {local_dir}: {e}")
-                    
-                    continue
+                    print(f"{Fore.RED}[FATAL] Cannot remove conflicting file {local_dir}: {e}")
+                
+                return False
+               
+        else:
+            
+            try:
+                is_directory(local_dir)
+                
+            except Exception as e:
+                print(f"{Fore.RED}[ERROR] Cannot create local dir {local_dir}: {e}")
+                
+                return False
 
-        #_____________________________
+    #_____________________________
 
-        # Cause paramiko dosn't support callback, wrap the sfpt.get that update tqdm
-        try:
-            # Get remote file size, and mtime
+    # Cause paramiko dosn't support callback, wrap the sfpt.get that update tqdm
+    try:
+        # Remote file size, and mtime from the listing, stat only if there is no listing
+        if info is None:
             remote_stat = sftp.sftp.stat(remote_file)
-            remote_mtime = remote_stat.st_mtime
+            info = files_info(remote_stat.st_size, remote_stat.st_mtime, remote_stat.st_mode)
+        
+        remote_mtime = info.mtime
+        
+        # Big file that already on client only get the changed blocks
+        if not _delta_get(sftp, remote_file, str(local_file), info.size, desc=file):
             
             # Downloading progress
-            _get_progress(sftp, remote_file, str(local_file), desc=file)
-            
-            # Match the mtime
-            if remote_mtime > 0:
-                fix_mtime(str(local_file), remote_mtime)
+            if not _get_progress(sftp, remote_file, str(local_file), info, desc=file, progress=progress):
                 
-            else:
-                print(f"Warning: Invalid mtime {remote_mtime} for {file}")
-                       
-        except FileNotFoundError as e:
-            print(f"{Fore.RED}[ERROR] FileNotFoundError: {e}")
-            
-        except PermissionError as e:
-            print(f"{Fore.RED}[ERROR] PermissionError: {e}")
+                return False
+        
+        # Match the mtime
+        if remote_mtime > 0:
+            fix_mtime(str(local_file), remote_mtime)
             
-        except Exception as e:
-            print(f"{Fore.RED}[FAILED] Download {file}: {e}")
-
-#Copy files from client to server
-def copy_client(sftp, upload: list[str]) -> None:
-
-    # Make individual dir of client files
-    for file in upload:
-        print(f"  → {file}")
-        client_file = client_location / file
-        remote_file = str(server_location / file)
+        else:
+            print(f"Warning: Invalid mtime {remote_mtime} for {file}")
         
-        # Creating sub-folder for remote files
-        remote_dir = os.path.dirname(remote_file)
-        _mkdir_p(sftp, remote_dir)
+        return True
+                   
+    except FileNotFoundError as e:
+        print(f"{Fore.RED}[ERROR] FileNotFoundError: {e}")
         
-        # Fix conflict files and dir
-        #_____________________________
+        return False
         
-        if remote_dir and remote_dir != str(server_location):
-            
-            try:
-                # Check what already exist at remote_dir
-                status = sftp.stat(remote_dir)
-                
-                # If directory it pass and continue
-                if not stat.S_ISDIR(status.st_mode):
-                    # Conflict remote_dir but is a file -> DELETE
-                    print(f"{Fore.RED}[CONFLICT] {remote_dir} is FILE, removing and create {Fore.YELLOW}DIRECTORY")
-                    sftp.remove(remote_dir)
-                    _mkdir_p(sftp, remote_dir)
-                
-            except FileNotFoundError:
-                _mkdir_p(sftp, remote_dir)
-                
-        #______________________________
+    except PermissionError as e:
+        print(f"{Fore.RED}[ERROR] PermissionError: {e}")
+        
+        return False
+        
+    except Exception as e:
+        print(f"{Fore.RED}[FAILED] Download {file}: {e}")
+        
+        return False
 
-        # Cause paramiko dosn't support callback, wrap the sfpt.put that update tqdm
-        try:
-            # get client mtime
-            client_mtime = client_file.stat().st_mtime
-            
-            # Uploading progress
-            _put_progress(sftp, str(client_file), remote_file, desc=file)
-            
-            # Set mtime via SFTP, and convert to (seconds, nanoseconds)
-            try:
-                sftp.sftp.utime(remote_file, (client_mtime, client_mtime))
-            
-            except Exception as e:
-                print(f"{Fore.RED}[WARN] Failed to set mtime on server for {file}: {e}")
-            
-        except FileNotFoundError as e:
-            print(f"{Fore.RED}[ERROR] FileNotFound: {e}")
-            
-        except PermissionError as e:
-            print(f"{Fore.RED}[ERROR] PermissionError: {e}")
-            
-        except Exception as e:
-            print(f"{Fore.RED}[FAILED] Upload {file}: {e}")
-            
-# Making a dir if is not there
-def _mkdir_p(sftp, remote_dir: str):
+# Upload one file from client to server, return True if it's done
+def upload_file(sftp, file: str, progress: bool = True, dirs: RemoteDirs = None) -> bool:
     
-    if not remote_dir or remote_dir in (".", "/"):
-        
-        return
+    print(f"  → {file}")
+    client_file = client_location / file
+    remote_file = str(server_location / file)
+    
+    # Creating sub-folder for remote files, the known one is not ask again
+    if dirs is None:
+        dirs = RemoteDirs(str(server_location))
     
-    # Create remote directory recursively
     try:
-        sftp.sftp.listdir(remote_dir)
+        dirs.ensure(sftp, os.path.dirname(file))
+    
+    except Exception as e:
+        print(f"{Fore.RED}[ERROR] Failed to create dir {os.path.dirname(remote_file)}: {e}")
         
-        return
+        return False
+
+    # Cause paramiko dosn't support callback, wrap the sfpt.put that update tqdm
+    try:
+        # get client mtime
+        client_mtime = client_file.stat().st_mtime
         
-    except IOError as e:
-        if getattr(e, 'errno', None) in (20, None) or 'not a directory' in str(e).lower():
-            print(f"{Fore.RED}[CONFLICT] Removing file blocking directory: {remote_dir}")
+        # Big file that already on server only put the changed blocks
+        if not _delta_put(sftp, str(client_file), remote_file, desc=file):
             
-            try:
-                
-                sftp.remove(remote_dir)
-                
-            except:
+            # Uploading progress
+            if not _put_progress(sftp, str(client_file), remote_file, desc=file, progress=progress):
                 
-                pass
-            
-    parent = os.path.dirname(remote_dir.rstrip('/'))
-    if parent and parent != remote_dir:
-        _mkdir_p(sftp, parent)
+                return False
+        
+        # Set mtime via SFTP, and convert to (seconds, nanoseconds)
+        try:
+            sftp.sftp.utime(remote_file, (client_mtime, client_mtime))
+        
+        except Exception as e:
+            print(f"{Fore.RED}[WARN] Failed to set mtime on server for {file}: {e}")
             
-    try:
-        sftp.sftp.mkdir(remote_dir)
-        print(f"{Fore.YELLOW}{Style.BRIGHT}[CREATE DIR]{Style.RESET_ALL} -> {remote_dir}")
-                    
+            return False
+        
+        return True
+        
+    except FileNotFoundError as e:
+        print(f"{Fore.RED}[ERROR] FileNotFound: {e}")
+        
+        return False
+        
+    except PermissionError as e:
+        print(f"{Fore.RED}[ERROR] PermissionError: {e}")
+        
+        return False
+        
     except Exception as e:
-        if "File exists" not in str(e) and "already exists" not in str(e).lower():
-            print(f"{Fore.RED}[ERROR] Failed to create dir {remote_dir}: {e}")
+        print(f"{Fore.RED}[FAILED] Upload {file}: {e}")
+        
+        return False
 
 # Making sure if dir
 def is_directory(path: Path):
@@ -372,70 +728,198 @@ def is_directory(path: Path):
         
     path.mkdir(parents=True, exist_ok=True)
 
-# Make a directory on local from sftp dir tree
-def make_local_dir(download_list: list[str]):
-    
-    # Create parent dir for files will be download
-    created = set()
-    
-    for file in download_list:
-        if not file.strip():
-            
-            continue
-        
-        local_path = client_location / file
-        dir_path = local_path.parent if local_path.suffix else local_path
-        if dir_path != client_location and dir_path not in created:
-            
-            try:
-                if dir_path.exists() and not dir_path.is_dir():
-                    print(f"{Fore.RED}[CONFLICT] Removing file blocking directory: {dir_path}")
-                    dir_path.unlink()
-                    
-                dir_path.mkdir(parents=True, exist_ok=True)
-                print(f"{Fore.CYAN}[DIR] Ensured: {str(dir_path.relative_to(client_location))}/")
-                created.add(dir_path)
-                
-            except Exception as e:
-                print(f"{Fore.RED}[ERROR] Failed to create directory {dir_path}: {e}")
-
 """--------------------------- 
 ||| The Essential Function |||
 ---------------------------"""
 
-# Determine what to copy
-def compute_diffs(server_map: files_map, client_map: files_map):
+# Check the entry is changed from the last sync
+def _changed(info: files_info, base: files_info) -> bool:
     
-    # Return as (download, and upload) -> List of Relative paths
-    download = []
-    upload = []
+    return info.size != base.size or int(info.mtime) != int(base.mtime)
+
+# The newer side wins
+def _newer(server_info: files_info, client_info: files_info) -> str:
     
-    all_location = set(server_map) | set(client_map)
+    return "upload" if int(client_info.mtime) > int(server_info.mtime) else "download"
+
+# Compare the size only, the server wins
+def _compare_size(relative: str, server_info: files_info, client_info: files_info, hasher) -> str:
     
-    for relative in all_location:
-        server_size = server_map.get(relative, None)
-        client_size = client_map.get(relative, None)
-        
-        if server_size is None:
-            upload.append(relative)
-            
-        elif client_size is None:
-            download.append(relative)
+    return "download" if server_info.size != client_info.size else None
+
+# Compare the size, and mtime
+def _compare_mtime(relative: str, server_info: files_info, client_info: files_info, hasher) -> str:
+    
+    if server_info.size == client_info.size and int(server_info.mtime) == int(client_info.mtime):
         
-        else:
-            if server_size != client_size:
-                download.append(relative)
-                                    
-    return download, upload
+        return None
+    
+    return _newer(server_info, client_info)
 
-# Fix modified time status don't match
-def fix_mtime(path: str, mtime: float) -> None:
+# Compare the content when the size is same, the hash is cached while (size, mtime) is not change
+def _compare_checksum(relative: str, server_info: files_info, client_info: files_info, hasher) -> str:
     
-    # Skip termux
-    if not mtime or mtime <= 0:
-        print(f"{Fore.RED}[WARN] Invalid mtime {mtime} for {path} — skipping")
+    if server_info.size != client_info.size or hasher is None:
         
-        return
+        return _compare_mtime(relative, server_info, client_info, hasher)
+    
+    if hasher(SERVER, relative, server_info) == hasher(CLIENT, relative, client_info):
+        
+        return None
+    
+    return _newer(server_info, client_info)
+
+# The compare_mode in config.py -> compare function
+comparators = {
+    "size": _compare_size,
+    "mtime": _compare_mtime,
+    "checksum": _compare_checksum,
+}
+
+# Make the hasher of checksum mode -> hasher(side, relative, info)
+def make_hasher(sftp, hashes: HashCache):
+    
+    def _hasher(side: str, relative: str, info: files_info) -> str:
+        
+        if side == SERVER:
+            compute = lambda: hash_remote(sftp, str(server_location / relative))
+            
+        else:
+            compute = lambda: hash_local(str(client_location / relative))
+        
+        return hashes.get(side, relative, info.size, info.mtime, compute)
+    
+    return _hasher
+
+# Determine what to copy for one path -> "download", "upload", or None
+def diff_entry(relative: str, server_info: files_info, client_info: files_info, server_base: files_map, client_base: files_map, hasher=None):
+    
+    if server_info is None:
+        
+        return "upload"
+        
+    elif client_info is None:
+        
+        return "download"
+    
+    elif stat.S_ISDIR(server_info.mode) and stat.S_ISDIR(client_info.mode):
+        
+        return None
+    
+    elif relative in server_base and relative in client_base:
+        # Three-way, copy from the side that changed since the last sync
+        server_changed = _changed(server_info, server_base[relative])
+        client_changed = _changed(client_info, client_base[relative])
+        
+        if server_changed and client_changed:
+            
+            # Both changed, but to the same content
+            if hasher is not None and server_info.size == client_info.size:
+                if hasher(SERVER, relative, server_info) == hasher(CLIENT, relative, client_info):
+                    
+                    return None
+            
+            print(f"{Fore.RED}[CONFLICT] {relative} changed on both side, server wins")
+            
+            return "download"
+            
+        elif server_changed:
+            
+            return "download"
+            
+        elif client_changed:
+            
+            return "upload"
+        
+        return None
+    
+    # The first time, there is no last state
+    compare = comparators.get(compare_mode, _compare_mtime)
+    
+    return compare(relative, server_info, client_info, hasher)
+
+# Determine what to copy
+def compute_diffs(server_map: files_map, client_map: files_map, baseline: tuple[files_map, files_map] = None):
+    
+    # Return as (download, and upload) -> List of Relative paths
+    download = []
+    upload = []
+    
+    # The (server, client) state from the last sync, if there is one
+    server_base, client_base = baseline or ({}, {})
+    
+    # Server paths, then the client paths that not on server, without a set of every path
+    all_location = chain(server_map, (relative for relative in client_map if relative not in server_map))
+    
+    for relative in all_location:
+        action = diff_entry(relative, server_map.get(relative, None), client_map.get(relative, None), server_base, client_base)
+        
+        if action == "upload":
+            upload.append(relative)
+            
+        elif action == "download":
+            download.append(relative)
+                                    
+    return download, upload
+
+# Load the (server, and client) state of the last sync
+def load_baseline(state: SyncState) -> tuple[files_map, files_map]:
+    
+    server_base = FileIndex(state.rows(SERVER))
+    client_base = FileIndex(state.rows(CLIENT))
+    
+    return server_base, client_base
+
+# Save the state after sync, the failed files keep the old state to try again next run
+def save_baseline(state: SyncState, server_map: files_map, client_map: files_map, baseline: tuple[files_map, files_map],
+                  pending: list[str], downloaded: list[str], uploaded: list[str], hashes: HashCache = None, skipped: list[str] = ()) -> None:
+    
+    server_base, client_base = baseline
+    server_new: files_map = server_map.copy()
+    client_new: files_map = client_map.copy()
+    
+    # Downloaded file is on client now, with the server mtime
+    for relative in downloaded:
+        status = (client_location / relative).stat()
+        client_new[relative] = files_info(status.st_size, status.st_mtime, status.st_mode)
+    
+    # Uploaded file is on server now, with the client mtime
+    for relative in uploaded:
+        info = client_map[relative]
+        mode = server_map[relative].mode if relative in server_map else info.mode
+        server_new[relative] = files_info(info.size, info.mtime, mode)
+    
+    # The failed copy, and the change of the direction that not asked, are still to sync next run
+    failed = set(pending) - set(downloaded) - set(uploaded)
+    failed.update(skipped)
+    
+    for relative in failed:
+        for new, base in ((server_new, server_base), (client_new, client_base)):
+            if relative in base:
+                new[relative] = base[relative]
+            
+            else:
+                new.pop(relative, None)
+        
+        # The server directory is listed again next run, the pruned walk skip the directory that have the saved mtime
+        parent = relative.rpartition("/")[0]
+        
+        while parent and parent in server_base:
+            server_new[parent] = server_base[parent]
+            parent = parent.rpartition("/")[0]
+    
+    # Only the hash that still match the saved (size, mtime)
+    state.save(SERVER, server_new, hashes.valid(SERVER, server_new) if hashes else None)
+    state.save(CLIENT, client_new, hashes.valid(CLIENT, client_new) if hashes else None)
+
+# Fix modified time status don't match
+def fix_mtime(path: str, mtime: float) -> None:
+    
+    # Skip termux
+    if not mtime or mtime <= 0:
+        print(f"{Fore.RED}[WARN] Invalid mtime {mtime} for {path} — skipping")
+        
+        return
     
     # Fix the file date, to match with original modified date
     try:
@@ -445,155 +929,701 @@ def fix_mtime(path: str, mtime: float) -> None:
     except Exception as e:
         print(f"Failed to set mtime on {path}: {e}")
 
-# A wrapper for show a progress bar
-def _get_progress(sftp, remote_location: str, client_location: str, desc: str) -> None:
+# Download only the changed blocks, return False to copy the whole file
+def _delta_get(sftp, remote_location: str, client_location: str, file_size: int, desc: str) -> bool:
+    
+    if file_size < delta_threshold or not os.path.isfile(client_location):
+        
+        return False
+    
+    try:
+        transferred = delta_download(sftp, remote_location, client_location, file_size, delta_block_size, download_throttle)
+        
+    except Exception as e:
+        print(f"{Fore.RED}[WARN] Delta download failed {desc}: {e}, copy the whole file")
+        
+        return False
+    
+    if transferred is None:
+        
+        return False
+    
+    print(f"{Fore.BLUE}{Style.BRIGHT}[DELTA]{Style.RESET_ALL} {desc} | {transferred // 1024} KB / {file_size // 1024} KB")
+    
+    return True
+
+# Upload only the changed blocks, return False to copy the whole file
+def _delta_put(sftp, client_location: str, remote_location: str, desc: str) -> bool:
+    
+    file_size = os.path.getsize(client_location)
+    
+    if file_size < delta_threshold:
+        
+        return False
+    
+    try:
+        if not stat.S_ISREG(sftp.stat(remote_location).st_mode):
+            
+            return False
+        
+        transferred = delta_upload(sftp, client_location, remote_location, file_size, delta_block_size, upload_throttle)
+        
+    except FileNotFoundError:
+        
+        return False
+        
+    except Exception as e:
+        print(f"{Fore.RED}[WARN] Delta upload failed {desc}: {e}, copy the whole file")
+        
+        return False
+    
+    if transferred is None:
+        
+        return False
+    
+    print(f"{Fore.GREEN}{Style.BRIGHT}[DELTA]{Style.RESET_ALL} {desc} | {transferred // 1024} KB / {file_size // 1024} KB")
+    
+    return True
+
+# One token bucket per direction that every worker share -> the take function, None if it's never limited
+def _throttle(direction: str, limit: int):
+    
+    if not limit and not limit_schedule:
+        
+        return None
+    
+    return TokenBucket(lambda: scheduled_limit(direction, limit, limit_schedule)).consume
+
+download_throttle = _throttle("download", download_limit)
+upload_throttle = _throttle("upload", upload_limit)
+
+# The buffer, and the SFTP request tuning of the copy
+_get_tuning = {"buffer_size": buffer_size, "prefetch_requests": prefetch_requests, "request_size": sftp_request_size, "throttle": download_throttle}
+_put_tuning = {"buffer_size": buffer_size, "request_size": sftp_request_size, "throttle": upload_throttle}
+
+# A wrapper for show a progress bar, info is the size and mtime of the server file
+def _get_progress(sftp, remote_location: str, client_location: str, info: files_info, desc: str, progress: bool = True) -> bool:
     
     try:
         # Download progres bar per (bytes)
-        file_size = sftp.stat(remote_location).st_size
+        file_size = info.size
         download = 0
+        
+        # Many workers at once, just one line when it's done
+        if not progress:
+            offset = resumable_get(sftp, remote_location, client_location, file_size, info.mtime, **_get_tuning)
+            resumed = f" (resumed from {offset // 1024} KB)" if offset else ""
+            print(f"{Fore.BLUE}{Style.BRIGHT}[DOWNLOAD]{Style.RESET_ALL} {desc} | {file_size // 1024} KB{resumed}")
+            
+            return True
+        
         print(f"{Fore.BLUE}{Style.BRIGHT}[DOWNLOAD]{Style.RESET_ALL} {desc} | 0 B / {file_size // 1024} KB", end="")
         
         def callback(transferred, total):
             nonlocal download
             download = transferred
-            percent = (transferred / file_size) * 100
+            percent = (transferred / file_size) * 100 if file_size else 100.0
             print(f"\r{Fore.BLUE}{Style.BRIGHT}[DOWNLOAD]{Style.RESET_ALL} {desc} | {transferred // 1024} KB / {file_size // 1024} KB ({percent:.1f}%)", end="")
         
-        sftp.sftp.get(remote_location, client_location, callback=callback)     
+        resumable_get(sftp, remote_location, client_location, file_size, info.mtime, callback=callback, **_get_tuning)
+        
+        return True
 
     except Exception as e:
         print(f"\n{Fore.RED}[ERROR] Download failed {desc}: {e}")
+        
+        return False
 
 # Progress bar on upload
-def _put_progress(sftp, client_location: str, remote_location: str, desc: str) -> None:
+def _put_progress(sftp, client_location: str, remote_location: str, desc: str, progress: bool = True) -> bool:
    
     try:
         # Upload progress bar per (bytes)
-        file_size = os.path.getsize(client_location)
+        client_stat = os.stat(client_location)
+        file_size = client_stat.st_size
         upload = 0
+        
+        # Many workers at once, just one line when it's done
+        if not progress:
+            offset = resumable_put(sftp, client_location, remote_location, file_size, client_stat.st_mtime, **_put_tuning)
+            resumed = f" (resumed from {offset // 1024} KB)" if offset else ""
+            print(f"{Fore.GREEN}{Style.BRIGHT}[UPLOAD]{Style.RESET_ALL} {desc} | {file_size // 1024} KB{resumed}")
+            
+            return True
+        
         print(f"{Fore.GREEN}{Style.BRIGHT}[UPLOAD]{Style.RESET_ALL} {desc} | 0 B / {file_size // 1024} KB", end="")
         
         def callback(transferred, total):
             nonlocal upload
             upload = transferred
-            percent = (transferred / file_size) * 100
+            percent = (transferred / file_size) * 100 if file_size else 100.0
             print(f"\r{Fore.GREEN}{Style.BRIGHT}[UPLOAD]{Style.RESET_ALL} {desc} | {transferred // 1024} KB / {file_size // 1024} KB ({percent:.1f}%)", end="")
             
-        sftp.sftp.put(client_location, remote_location, callback=callback, confirm=True)       
+        resumable_put(sftp, client_location, remote_location, file_size, client_stat.st_mtime, callback=callback, **_put_tuning)
+        
+        return True
 
     except Exception as e:
         print(f"{Fore.RED}[ERROR] Upload failed {desc}: {e}")
+        
+        return False
 
-"""---------------------- 
-||| The Menu Function |||
-----------------------"""
+"""------------------------------ 
+||| The Streaming Sync Function |||
+------------------------------"""
 
-# List the files of server
-def list_server_files():
+# List one server directory -> [(name, info)] sorted by name, without the ignored entry
+def list_server_dir(sftp, relative: str, ignore: IgnoreRules = None) -> list[tuple[str, files_info]]:
     
-    # Intialize SFTP connection
-    sftp = SFTP()
+    server_path: str = str(server_location).rstrip("/")
+    server_dir = f"{server_path}/{relative}" if relative else server_path
+    entries = []
+    ignored = ignore.for_dir(relative) if ignore else None
     
-    list = list_server(sftp)
+    for entry in sftp.sftp.listdir_attr(server_dir):
+        if is_partial(entry.filename):
+            
+            continue
+        
+        if ignored and ignored(entry.filename, stat.S_ISDIR(entry.st_mode)):
+            
+            continue
+        
+        size = 0 if stat.S_ISDIR(entry.st_mode) else entry.st_size
+        entries.append((entry.filename, files_info(size, entry.st_mtime or 0, entry.st_mode)))
     
-    try:
+    entries.sort()
+    
+    return entries
+
+# The unchanged server directory -> the last listing, only the sub-dir is stat for the new mtime
+def list_server_dir_unchanged(sftp, relative: str, server_base: FileIndex) -> list[tuple[str, files_info]]:
+    
+    server_path: str = str(server_location).rstrip("/")
+    entries = []
+    
+    for name, info in server_base.listdir(relative):
+        
+        # The file inside the sub-dir change the sub-dir mtime, not this one
+        if stat.S_ISDIR(info.mode):
+            status = sftp.sftp.stat(f"{server_path}/{relative}/{name}" if relative else f"{server_path}/{name}")
+            info = files_info(0, status.st_mtime or 0, status.st_mode)
+        
+        entries.append((name, info))
+    
+    return entries
+
+# List one client directory -> [(name, info)] sorted by name, without the ignored entry
+def list_client_dir(relative: str, ignore: IgnoreRules = None) -> list[tuple[str, files_info]]:
+    
+    client_dir = client_location / relative if relative else client_location
+    
+    return scan_dir(str(client_dir), str(client_location), ignore, relative)
+
+# Merge both tree directory by directory, and yield (action, relative) once a directory is reconciled
+# prune -> the server directory that have the same mtime as the last sync is not listed, the last listing is used
+# server_index -> the whole server tree that already listed, no listing while walking
+# ignore -> the ignored entry is not listed on both side, so it's never copied nor deleted
+def stream_diffs(executor: ChannelExecutor, baseline: tuple[files_map, files_map], server_seen: files_map, client_seen: files_map, hasher=None,
+                 prune: bool = False, root_unchanged: bool = False, server_index: FileIndex = None, ignore: IgnoreRules = None):
+    
+    server_base, client_base = baseline
+    
+    # Ask the server listing before it's needed, the workers list while we merge
+    def _pending(relative: str, on_server: bool, on_client: bool, unchanged: bool = False):
+        
+        if on_server and server_index is not None:
+            future = Future()
+            future.set_result(server_index.listdir(relative))
+        
+        elif on_server and unchanged:
+            future = executor.submit(list_server_dir_unchanged, relative, server_base)
+        
+        else:
+            future = executor.submit(list_server_dir, relative, ignore) if on_server else None
+        
+        return relative, future, on_client
+    
+    # The directory entries only change when the directory mtime change
+    def _unchanged(relative: str, server_info: files_info) -> bool:
+        
+        base = server_base.get(relative) if prune else None
+        
+        return base is not None and stat.S_ISDIR(base.mode) and int(base.mtime) == int(server_info.mtime)
+    
+    # Depth first, so the stack only hold the directory fan-out
+    stack = [_pending("", True, client_location.exists(), prune and root_unchanged)]
+    
+    while stack:
+        relative_dir, future, on_client = stack.pop()
+        
+        try:
+            server_entries = future.result() if future else []
+            client_entries = list_client_dir(relative_dir, ignore) if on_client else []
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] walking to tree: {relative_dir or '.'}: {e}, skipped")
+            
+            # Keep the last state of the skipped tree, and the directory itself so it's not pruned next run
+            prefix = f"{relative_dir}/" if relative_dir else ""
+            
+            for base, seen in ((server_base, server_seen), (client_base, client_seen)):
+                if relative_dir:
+                    if relative_dir in base:
+                        seen[relative_dir] = base[relative_dir]
+                    
+                    else:
+                        seen.pop(relative_dir, None)
+                
+                for relative, info in base.items():
+                    if relative.startswith(prefix):
+                        seen[relative] = info
+            
+            continue
         
-        # Tree function
-        def tree(dictionary):
+        subdirs = []
+        i = j = 0
+        
+        while i < len(server_entries) or j < len(client_entries):
+            server_name = server_entries[i][0] if i < len(server_entries) else None
+            client_name = client_entries[j][0] if j < len(client_entries) else None
+            server_info = client_info = None
+            
+            if client_name is None or (server_name is not None and server_name <= client_name):
+                name, server_info = server_entries[i]
+                i += 1
+                
+                if name == client_name:
+                    client_info = client_entries[j][1]
+                    j += 1
+            
+            else:
+                name, client_info = client_entries[j]
+                j += 1
+            
+            relative = f"{relative_dir}/{name}" if relative_dir else name
+            
+            if server_info is not None:
+                server_seen[relative] = server_info
             
-            tree = {}
+            if client_info is not None:
+                client_seen[relative] = client_info
             
-            for location, size in dictionary.items():
-                path = location.split('/')
-                current = tree
+            action = diff_entry(relative, server_info, client_info, server_base, client_base, hasher)
+            
+            if action:
                 
-                for p in path:
-                    if p not in current:
-                        current[p] = {'_size': 0, '_children': {}}
-                    current = current[p]['_children']
-                current['_size'] = size
+                yield action, relative
+            
+            server_dir = server_info is not None and stat.S_ISDIR(server_info.mode)
+            client_dir = client_info is not None and stat.S_ISDIR(client_info.mode)
+            
+            if server_dir or client_dir:
+                subdirs.append(_pending(relative, server_dir, client_dir, server_dir and _unchanged(relative, server_info)))
+        
+        stack.extend(reversed(subdirs))
+
+# Walk, diff, and copy at same time, return as (pending, downloaded, uploaded)
+def stream_sync(sftp, state: SyncState, download: bool = True, upload: bool = True) -> tuple[list[str], list[str], list[str]]:
+    
+    baseline = load_baseline(state)
+    server_seen: files_map = FileIndex()
+    client_seen: files_map = FileIndex()
+    pending: list[str] = []
+    downloaded: list[str] = []
+    uploaded: list[str] = []
+    skipped: list[str] = []
+    
+    # Show the live progress bar only when there is one worker
+    progress = transfer_workers <= 1
+    executor = ChannelExecutor(sftp, walk_workers)
+    
+    # The server directories, known from the listing as it's walked
+    dirs = RemoteDirs(str(server_location), server_seen)
+    
+    # The same rules for both side, and for the whole run
+    ignore = load_ignore(sftp)
+    
+    # Skip the unchanged server directory, but walk everything once every full_rescan_interval, or when the ignore rules changed
+    started = time.time()
+    full_scan = full_rescan_interval <= 0 or started - float(state.get_meta("last_full_scan", 0)) >= full_rescan_interval
+    full_scan = full_scan or state.get_meta("ignore_digest", "") != ignore.digest
+    root_mtime = sftp.stat(str(server_location)).st_mtime if full_rescan_interval > 0 else None
+    root_unchanged = root_mtime is not None and int(root_mtime) == int(float(state.get_meta("server_root_mtime", -1)))
+    
+    # The whole server tree with one find, if the server allow it
+    server_index = exec_listing(sftp, str(server_location).rstrip("/"), ignore) if server_listing == "auto" else None
+    
+    # Checksum mode, start from the saved hashes
+    hashes = hasher = None
+    
+    if compare_mode == "checksum" or (detect_moves and move_checksum):
+        hashes = HashCache({SERVER: state.hashes(SERVER), CLIENT: state.hashes(CLIENT)})
+        hasher = make_hasher(sftp, hashes)
+    
+    # The vanished, and the new path wait the end of the walk, to be paired as the move
+    moves = MoveDetector(baseline, move_min_size) if detect_moves else None
+    wanted = lambda action: (action == "download" and download) or (action == "upload" and upload)
+    
+    # Only the direction that asked
+    def _actions():
+        
+        for action, relative in stream_diffs(executor, baseline, server_seen, client_seen, hasher if compare_mode == "checksum" else None,
+                                             not full_scan, root_unchanged, server_index, ignore):
+            if moves is not None and moves.hold(action, relative, server_seen.get(relative), client_seen.get(relative)):
+                
+                continue
+            
+            if wanted(action):
+                pending.append(relative)
                 
-            return tree
+                yield action, relative
+            
+            else:
+                skipped.append(relative)
         
-        # Make visual to tree
-        def tree_visual(node, prefix="", is_last=True, is_root=True):
+        if moves is None:
             
-            if is_root:
-                server_dir = str(server_location)
-                server_root = os.path.basename(server_dir.rstrip('/\\'))
-                print(server_root)
-                new_prefix = ""
+            return
+        
+        # Rename on server is the upload of the client move, rename on client is the download of the server move
+        pairs = moves.pairs(hasher if move_checksum else None)
+        pairs = [pair for pair in pairs if wanted("upload" if pair[0] == SERVER else "download")]
+        done = apply_moves(sftp, pairs, dirs, server_seen, client_seen)
+        removed = remove_emptied(sftp, moves.emptied(done), server_seen, client_seen)
+        
+        for side, _, relative, _ in done:
+            pending.append(relative)
+            (uploaded if side == SERVER else downloaded).append(relative)
+        
+        for action, relative in moves.rest(done, removed):
+            if wanted(action):
+                pending.append(relative)
+                
+                yield action, relative
             
             else:
-                connector = "└── " if is_last else "├── "
+                skipped.append(relative)
+    
+    # The size of the small files to batch
+    def _info(action: str, relative: str) -> files_info:
+        
+        return server_seen[relative] if action == "download" else client_seen[relative]
+    
+    # Copy one path, the directory just created on other side
+    def _copy(sftp, item: tuple[str, str]) -> None:
+        
+        action, relative = item
+        
+        if isinstance(relative, tuple):
+            (downloaded if action == "download" else uploaded).extend(copy_batch(sftp, action, relative, progress, server_seen, dirs))
+        
+        elif action == "download":
+            if stat.S_ISDIR(server_seen[relative].mode):
+                is_directory(client_location / relative)
+                downloaded.append(relative)
+            
+            elif download_file(sftp, relative, progress, server_seen[relative]):
+                downloaded.append(relative)
+        
+        else:
+            if stat.S_ISDIR(client_seen[relative].mode):
                 
-                # Get the name of this node (we need to pass it from parent)
-                new_prefix = prefix + ("    " if is_last else "|    ")
+                try:
+                    dirs.ensure(sftp, relative)
+                    uploaded.append(relative)
                 
-            # Get all children
-            children = []
+                except Exception as e:
+                    print(f"{Fore.RED}[ERROR] Failed to create dir {server_location / relative}: {e}")
             
-            for key, value in node.items():
-                if key == '_size':
+            elif upload_file(sftp, relative, progress, dirs):
+                uploaded.append(relative)
+    
+    try:
+        run_transfers(sftp, ordered(batched(sftp, _actions(), _info), _info), _copy, transfer_workers)
+    
+    finally:
+        executor.close()
+    
+    # Remember both side for the next run
+    save_baseline(state, server_seen, client_seen, baseline, pending, downloaded, uploaded, hashes, skipped)
+    
+    # The skipped path in the root need the root listed again
+    if root_mtime is not None and not any("/" not in relative for relative in skipped):
+        state.set_meta("server_root_mtime", root_mtime)
+    
+    if full_scan:
+        state.set_meta("last_full_scan", started)
+        state.set_meta("ignore_digest", ignore.digest)
+    
+    return pending, downloaded, uploaded
+
+"""---------------------- 
+||| The Move Function |||
+----------------------"""
+
+# Rename the moved file on the side that still have the old path -> the pairs that done
+def apply_moves(sftp, pairs: list[tuple[str, str, str, files_info]], dirs: RemoteDirs, server_seen: files_map, client_seen: files_map) -> list[tuple]:
+    
+    done = []
+    
+    for side, old, new, info in pairs:
+        
+        try:
+            if side == SERVER:
+                dirs.ensure(sftp, os.path.dirname(new))
+                old_path, new_path = str(server_location / old), str(server_location / new)
+                
+                # Skip if something came to the new path after the walk, the posix-rename would replace it
+                try:
+                    sftp.sftp.lstat(new_path)
+                
+                except FileNotFoundError:
                     
-                    continue
+                    pass
+                
+                else:
+                    raise FileExistsError(f"{new} is already on server")
+                
+                try:
+                    sftp.sftp.posix_rename(old_path, new_path)
                 
-                children.append((key, value))
+                except IOError:
+                    sftp.sftp.rename(old_path, new_path)
                 
-            # Sort for consistent output
-            children.sort(key=lambda x: x[0])
+                seen = server_seen
             
-            for i, (name, child_node) in enumerate(children):
+            else:
+                is_directory((client_location / new).parent)
+                
+                # Same on client, os.rename replace it too
+                if os.path.lexists(client_location / new):
+                    raise FileExistsError(f"{new} is already on client")
+                
+                os.rename(client_location / old, client_location / new)
+                seen = client_seen
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] Move {old} → {new}: {e}, copy it instead")
+            
+            continue
+        
+        seen.pop(old, None)
+        seen[new] = info
+        done.append((side, old, new, info))
+        color = Fore.GREEN if side == SERVER else Fore.BLUE
+        print(f"{color}{Style.BRIGHT}[MOVE]{Style.RESET_ALL} {old} → {new}")
+    
+    return done
+
+# Remove the directory that the moves left empty, on the side it's still there -> the removed relative paths
+def remove_emptied(sftp, emptied: list[tuple[str, str]], server_seen: files_map, client_seen: files_map) -> set[str]:
+    
+    removed = set()
+    
+    for side, relative in emptied:
+        
+        try:
+            if side == SERVER:
+                sftp.rmdir(str(server_location / relative))
+                server_seen.pop(relative, None)
+            
+            else:
+                os.rmdir(client_location / relative)
+                client_seen.pop(relative, None)
+        
+        # Not empty, something else is in it
+        except (IOError, OSError):
+            
+            continue
+        
+        removed.add(relative)
+    
+    return removed
+
+"""----------------------- 
+||| The Watch Function |||
+-----------------------"""
+
+# Remove the server path, and everything under it that not changed since the last sync -> True if all removed
+def _remove_server_tree(sftp, state: SyncState, relative: str, status: paramiko.SFTPAttributes) -> bool:
+    
+    remote_path = str(server_location / relative)
+    
+    if not stat.S_ISDIR(status.st_mode):
+        base = state.get(SERVER, relative)
+        
+        # New, or changed on server since the last sync, the next full sync download it back
+        if base is None or _changed(files_info(status.st_size, status.st_mtime, status.st_mode), files_info(*base)):
+            print(f"{Fore.RED}[CONFLICT] {relative} deleted on client but changed on server, keep it")
+            
+            return False
+        
+        sftp.remove(remote_path)
+        
+        return True
+    
+    removed = True
+    
+    for entry in sftp.sftp.listdir_attr(remote_path):
+        removed = _remove_server_tree(sftp, state, f"{relative}/{entry.filename}", entry) and removed
+    
+    if removed:
+        sftp.rmdir(remote_path)
+    
+    return removed
+
+# Push the touched client paths to server, and remember them in the state
+def push_changes(sftp, state: SyncState, paths: list[str]) -> None:
+    
+    uploads: list[str] = []
+    dirs: list[str] = []
+    deletes: list[str] = []
+    
+    for relative in paths:
+        
+        try:
+            status = os.stat(client_location / relative)
+        
+        except FileNotFoundError:
+            deletes.append(relative)
+            
+            continue
+        
+        info = files_info(0 if stat.S_ISDIR(status.st_mode) else status.st_size, status.st_mtime, status.st_mode)
+        base = state.get(CLIENT, relative)
+        
+        # Same as the last sync, like the file that just downloaded
+        if base is not None and not _changed(info, files_info(*base)):
+            
+            continue
+        
+        if stat.S_ISDIR(status.st_mode):
+            dirs.append(relative)
+        
+        elif stat.S_ISREG(status.st_mode):
+            uploads.append(relative)
+    
+    remote_dirs = RemoteDirs(str(server_location))
+    remote_dirs.prepare(sftp, dirs)
+    done = [relative for relative in dirs if relative in remote_dirs.known]
+    done += copy_client(sftp, uploads)
+    
+    # The pushed path is the same on both side now
+    client_new: files_map = {}
+    server_new: files_map = {}
+    
+    for relative in done:
+        status = os.stat(client_location / relative)
+        info = files_info(0 if stat.S_ISDIR(status.st_mode) else status.st_size, status.st_mtime, status.st_mode)
+        client_new[relative] = info
+        server_new[relative] = info
+    
+    state.update(CLIENT, client_new)
+    state.update(SERVER, server_new)
+    
+    if not (watch_delete and deletes):
+        
+        return
+    
+    removed: list[str] = []
+    
+    # The directory remove everything under it, skip the path in it
+    deleted = set(deletes)
+    deletes = [relative for relative in deletes if not any(str(parent) in deleted for parent in Path(relative).parents)]
+    
+    for relative in deletes:
+        remote_path = str(server_location / relative)
+        base = state.get(SERVER, relative)
+        
+        # Never synced, the server copy is not from this client
+        if base is None:
+            
+            continue
+        
+        try:
+            if not _remove_server_tree(sftp, state, relative, sftp.stat(remote_path)):
+                
+                continue
+            
+            print(f"{Fore.RED}{Style.BRIGHT}[DELETE]{Style.RESET_ALL} {relative}")
+        
+        except FileNotFoundError:
+            
+            pass
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] Delete {relative} on server: {e}")
+            
+            continue
+        
+        removed.append(relative)
+    
+    state.remove(CLIENT, removed)
+    state.remove(SERVER, removed)
+
+"""---------------------- 
+||| The Menu Function |||
+----------------------"""
+
+# List the files of server
+def list_server_files():
+    
+    # The SFTP connection of this session
+    sftp = pool.get()
+    
+    list = list_server(sftp)
+    
+    try:
+        
+        # Print the server root, then the tree under it
+        server_dir = str(server_location)
+        print(os.path.basename(server_dir.rstrip('/\\')))
+        
+        # Make visual to tree, straight from the index
+        def tree_visual(relative="", prefix=""):
+            
+            children = list.listdir(relative)
+            
+            for i, (name, info) in enumerate(children):
                 is_last_child = (i == len(children) -1)
                 
                 # Determine if this is a file or directory
-                size = child_node.get('_size', 0)
-                
-                if size > 0:
-                    # it's files
-                    size_str = f" ({size} bytes)"
+                if stat.S_ISDIR(info.mode):
+                    size_str = ""
                     
                 else:
-                    # it's directory
-                    size_str = ""
+                    size_str = f" ({info.size} bytes)"
                     
                 connector = "└── " if is_last_child else "├── "
                 print(prefix + connector + name + size_str)
                 
                 # Recurse into children
-                child_prefix = prefix + ("    " if is_last_child else "│   ")
-                tree_visual(child_node['_children'], child_prefix, is_last_child, is_root=False)
+                if stat.S_ISDIR(info.mode):
+                    child_prefix = prefix + ("    " if is_last_child else "│   ")
+                    tree_visual(f"{relative}/{name}" if relative else name, child_prefix)
 
-        tree_dir = tree(list)
-        tree_visual(tree_dir)
+        tree_visual()
         
     except Exception as e:
         print(f"Listing error: {e}")
         
     finally:
-        sftp.close()
         print("\n")
 
 # Transfer files from server to client
 def get_files() -> None:
 
-    # Intialize SFTP connection
-    sftp = SFTP()
-    
-    # Declare the list
-    server_map = list_server(sftp)
-    client_map = list_client()
-
-    download, upload = compute_diffs(server_map, client_map)
-    
-    # Fix the prompt error
-    download = [path for path in download if server_map.get(path, -1) != 0]
+    # The SFTP connection of this session
+    sftp = pool.get()
+    state = SyncState(state_file)
 
     try:
+        
+        # Walk, and download at same time
+        pending, downloaded, uploaded = stream_sync(sftp, state, download=True, upload=False)
 
-        if download:
-            copy_server(sftp, download)
+        if pending:
             print(f"{Fore.GREEN}Getting Files from server complete!")
 
         else:
@@ -603,25 +1633,22 @@ def get_files() -> None:
         print(f"{Fore.RED}Error: {e}")
 
     finally:
-        sftp.close()
+        state.close()
         print("\n")
 
 # Transfer files from client to server  
 def put_files() -> None:
 
-    # Intialize SFTP connection
-    sftp = SFTP()
-    
-    # Declare the list
-    server_map = list_server(sftp)
-    client_map = list_client()
-
-    download, upload = compute_diffs(server_map, client_map)
+    # The SFTP connection of this session
+    sftp = pool.get()
+    state = SyncState(state_file)
 
     try:
+        
+        # Walk, and upload at same time
+        pending, downloaded, uploaded = stream_sync(sftp, state, download=False, upload=True)
 
-        if upload:
-            copy_client(sftp, upload)
+        if pending:
             print(f"{Fore.GREEN}Getting Files from server complete!")
 
         else:
@@ -631,159 +1658,233 @@ def put_files() -> None:
         print(f"{Fore.RED}ERROR: {e}")
 
     finally:
-        sftp.close()
+        state.close()
+        print("\n")
+
+# Show what the prune, and the sync would do, and how long it take on the link of now, nothing is changed
+# prune -> SERVER or CLIENT, the path only on that side is deleted first, so it's not copied
+# probe_size -> bytes of the throughput probe, 0 only measure the round trip, paths -> show every path too
+def plan_sync(download: bool = True, upload: bool = True, prune: str = None, as_json: bool = False, probe_size: int = 4 * 1024 * 1024,
+              paths: bool = False) -> dict:
+    
+    sftp = pool.get()
+    state = SyncState(state_file)
+    
+    try:
+        
+        ignore = load_ignore(sftp)
+        server_map = list_server(sftp, ignore)
+        client_map = list_client(ignore)
+        download_list, upload_list = compute_diffs(server_map, client_map, load_baseline(state))
+        actions = []
+        
+        if prune == SERVER:
+            actions += [("delete server", relative, info) for relative, info in server_map.items() if relative not in client_map]
+            download_list = [relative for relative in download_list if relative in client_map]
+        
+        elif prune == CLIENT:
+            actions += [("delete client", relative, info) for relative, info in client_map.items() if relative not in server_map]
+            upload_list = [relative for relative in upload_list if relative in server_map]
+        
+        actions += [("download", relative, server_map[relative]) for relative in (download_list if download else [])]
+        actions += [("upload", relative, client_map[relative]) for relative in (upload_list if upload else [])]
+        
+        # The small file go in the tar batch, only if the server can
+        batching = batch_threshold > 0 and tar_supported(sftp)
+        summary = summarize(actions, batch_threshold if batching else 0)
+        link = measure_link(sftp, str(server_location).rstrip("/"), probe_size)
+        
+        # The limit of now is the most the link give
+        for direction, limit in (("upload", upload_limit), ("download", download_limit)):
+            limit = scheduled_limit(direction, limit, limit_schedule)
+            
+            if limit > 0 and link[direction]:
+                link[direction] = min(link[direction], float(limit))
+        
+        workers = {"download": transfer_workers, "upload": transfer_workers, "delete server": delete_workers}
+        plan = build_plan(summary, link, workers, batch_files if batching else 0, delete_mode != "sftp")
+        
+        if as_json:
+            print(json.dumps(plan, indent=2))
+            
+            return plan
+        
+        if paths:
+            tags = {"download": f"{Fore.BLUE}[GET]", "upload": f"{Fore.GREEN}[PUT]", "delete server": f"{Fore.RED}[DELETE]", "delete client": f"{Fore.RED}[DELETE]"}
+            
+            for action, relative, _ in actions:
+                print(f"{tags[action]}{Style.RESET_ALL} {relative}")
+            
+            print()
+        
+        print(render(plan))
+        print("\nDry run, nothing changed.\n")
+        
+        return plan
+    
+    finally:
+        state.close()
+
+# Push the client changes to server as they happen, until Ctrl+C
+def watch_client() -> None:
+    
+    state = SyncState(state_file)
+    
+    # Full sync at start, every reconcile interval, and when the kernel drop the events
+    # The failed full sync don't stop the watch, the next interval try again
+    def _reconcile() -> None:
+        
+        print(f"{Fore.CYAN}[WATCH] Full sync...")
+        
+        try:
+            stream_sync(pool.get(), state, download=user_config == 1, upload=True)
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] Full sync failed: {e}, the next interval try again")
+    
+    # Every push ask the pool, so the lost connection is connect again
+    def _push(paths: list[str]) -> None:
+        
+        try:
+            push_changes(pool.get(), state, paths)
+        
+        except Exception as e:
+            print(f"{Fore.RED}[ERROR] Push failed: {e}, the next full sync try again")
+    
+    try:
+        print(f"{Fore.CYAN}[WATCH] Watching {client_location}, press Ctrl+C to stop")
+        watch(str(client_location), _push, _reconcile, watch_debounce, watch_reconcile_interval, load_ignore(pool.get()))
+    
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}Watch stopped")
+    
+    except Exception as e:
+        print(f"{Fore.RED}Error: {e}")
+    
+    finally:
+        state.close()
         print("\n")
 
+# Show the paths that will be deleted, the deleted directory is one line with what is in it
+def preview_delete(plan: DeletePlan) -> None:
+    
+    for relative, info, count, size in plan.roots():
+        if stat.S_ISDIR(info.mode):
+            print(f"[D] {relative} | {count - 1} items, {size}")
+        
+        elif stat.S_ISREG(info.mode):
+            print(f"[F] {relative} | {size}")
+        
+        else:
+            print(f"[?] {relative}")
+    
+    print(f"\n{plan.files} files, {plan.dirs} directories, {plan.bytes} bytes")
+
+# Tell what is done, every path that can't be removed with the reason
+def report_delete(plan: DeletePlan, removed: list[str], failed: list[tuple[str, str]], side: str) -> None:
+    
+    for relative, message in sorted(failed):
+        print(f"{Fore.RED}[ERROR] {relative} -> {message}")
+    
+    print(f"\nFinished: {len(removed)}/{len(plan)} items removed from {side}, {len(failed)} failed.")
+
 # Deletes the file from server is there files that not in client
-def delete_server() -> None:
+# confirm -> ask before removing, dry_run -> only show what would be removed
+def delete_server(confirm: bool = True, dry_run: bool = False) -> None:
     
-    sftp = SFTP()
+    sftp = pool.get()
     
     try:
         
-        server_files = list_server(sftp)
-        client_files = list_client()
+        ignore = load_ignore(sftp)
+        server_files = list_server(sftp, ignore)
+        client_files = list_client(ignore)
 
-        # List files or dir on client, that not in server
-        delete = [p for p in server_files if p not in client_files]
+        # List files or dir on client, that not in server, the listed metadata is enough to plan it
+        plan = DeletePlan((relative, info) for relative, info in server_files.items() if relative not in client_files)
         
-        if not delete:
+        if not plan:
             print("There are no FILES or DIR, that are missing on in server")
             
             return
+        
+        preview_delete(plan)
+        
+        if dry_run:
+            print("Dry run, nothing removed.")
             
-        for path in delete:
-            full_path = str(server_location / path)
-            
-            try:
-                status = sftp.stat(full_path)
-                
-                if stat.S_ISREG(status.st_mode):
-                    size = status.st_size
-                    
-                    print(f"[F] {path} | {size}")
-                    
-                elif stat.S_ISDIR(status.st_mode):
-                    print(f"[D] {path}")
-                    
-                else:
-                    print(f"[?] {path}")
-            
-            except FileNotFoundError:
-                print(f"Files are disappeared on server: {path}")
-                
-                continue
+            return
+        
+        if confirm:
+            print("\n")
+            print("Are you sure want to remove files in above?")
             
-            except Exception as e:
-                print(f"{Fore.RED}[ERROR] Could not get status for {path}: {e}")
+            if input(": ").strip().lower() != 'y':
+                print("Deletion cancelled.")
                 
-                continue
-            
-        print("\n")
-        print("Are you sure want to remove files in above?")
-        confirm = input(": ").strip().lower()
+                return
         
-        if confirm != 'y':
-            print("Deletion cancelled.")
+        root = str(server_location).rstrip("/")
+        executor = ChannelExecutor(sftp, delete_workers)
+        
+        try:
+            result = None
             
-            return
-
-        deleted = 0
-        for files in delete:
-            full_path = str(server_location / files)
-                    
-            try:
-                status = sftp.stat(full_path)
-                
-                if stat.S_ISREG(status.st_mode):
-                    sftp.remove(full_path)
+            # The rm -rf take the unlisted file too, so not with the ignore rules
+            # The idle channels close first, every rm take one session
+            if delete_mode in ("auto", "tree"):
+                sftp.trim()
+                workers = min(delete_workers, sftp.free_sessions())
+                result = exec_delete(sftp, executor, root, plan, delete_mode == "tree" and not ignore, workers)
             
-                elif stat.S_ISDIR(status.st_mode):
-                    sftp.rmdir(full_path)
-
-                else:
-                    print(f"Skipped (not file/dir): {files}")
-                    
-                deleted += 1
-                                
-            except OSError as e:
-                print(f"{Fore.RED}[ERROR] {files} -> {e}")
-                
-            except Exception as e:
-                print(f"{Fore.RED}[UNEXPECTED] {files} -> {e}")
-                
-        print(f"\nFinished: {deleted}/{len(delete)} items removed from server.")
+            if result is None:
+                result = sftp_delete(executor, root, plan)
+        
+        finally:
+            executor.close()
+        
+        report_delete(plan, *result, "server")
 
     finally:
-        sftp.close()
         print("\n")
         
 # Deletes the file from client is there files that not in server
-def delete_client() -> None:
+# confirm -> ask before removing, dry_run -> only show what would be removed
+def delete_client(confirm: bool = True, dry_run: bool = False) -> None:
     
-    sftp = SFTP()
+    sftp = pool.get()
     
     try:
         
-        server_files: Dict[str, int] = list_server(sftp)
-        client_files: Dict[str, int] = list_client()
+        ignore = load_ignore(sftp)
+        server_files: files_map = list_server(sftp, ignore)
+        client_files: files_map = list_client(ignore)
 
         # List files or dir on client, that not in server
-        delete = [p for p in client_files if p not in server_files]
+        plan = DeletePlan((relative, info) for relative, info in client_files.items() if relative not in server_files)
         
-        if not delete:
+        if not plan:
             print("There are no FILES or DIR, that are missing on in server")
             
             return
-            
-        for p in delete:
-            full_path = client_location / p
-            path = full_path
-            
-            if path.is_file():
-                size = path.stat().st_size
-                print(f"[F] {path} | {size}")
-                
-            elif path.is_dir():
-                print(f"[D] {path}")
-                
-            else:
-                print(f"[?] {path}")
-            
-        print("\n")
-        print("Are you sure want to remove files in above?")
-        confirm = input(": ").strip().lower()
         
-        if confirm != 'y':
-            print("Deletion cancelled.")
+        preview_delete(plan)
+        
+        if dry_run:
+            print("Dry run, nothing removed.")
             
             return
-
-        deleted = 0
-        for f in delete:
-            full_path = client_location / f
-            files = full_path
-            
-            try:
-                if files.is_file():
-                    files.unlink()
+        
+        if confirm:
+            print("\n")
+            print("Are you sure want to remove files in above?")
             
-                elif files.is_dir():
-                    files.rmdir()
-
-                else:
-                    print(f"Skipped (not file/dir): {f}")
-                    
-                deleted += 1
-                                
-            except OSError as e:
-                print(f"[Error] {files} -> {e}")
+            if input(": ").strip().lower() != 'y':
+                print("Deletion cancelled.")
                 
-            except Exception as e:
-                print(f"[Unexpected] {files} -> {e}")
-                
-        print(f"\nFinished: {deleted}/{len(delete)} items removed from client.")
+                return
+        
+        report_delete(plan, *local_delete(str(client_location), plan), "client")
 
     finally:
-        sftp.close()
         print("\n")
\ No newline at end of file
@@ -0,0 +1,176 @@
+import os
+import stat
+from typing import Callable, Dict, Optional
+from core.index import FileIndex, files_info
+from core.state import SERVER, CLIENT
+
+"""-------------------------------
+||| The Move Detection Function |||
+-------------------------------"""
+
+# The side the rename is done on -> SERVER when the client moved the file, CLIENT when the server moved it
+# (kind, (size, mtime)) -> [(relative, info)]
+_slots = Dict[tuple[str, tuple[int, int]], list[tuple[str, files_info]]]
+
+# Pair the path that vanished on one side with the new path of the same (size, mtime) on the same side
+# The pair is only a rename, and the held path that have no pair go back to the normal copy
+class MoveDetector:
+
+    # baseline is the (server, client) of the last sync, the file smaller than min_size is just copied
+    def __init__(self, baseline: tuple, min_size: int = 0):
+        self.server_base, self.client_base = baseline
+        self.min_size = min_size
+        self.gone: _slots = {}
+        self.new: _slots = {}
+
+        # The synced directory that vanished on one side -> [(kind, relative)], it can be emptied by the moves
+        self.dirs: list[tuple[str, str]] = []
+
+        # (size, mtime) of the synced files, the new file that match none of them can't be a move
+        self.keys: set[tuple[int, int]] = set()
+
+        for base in baseline:
+            for info in (base.infos() if isinstance(base, FileIndex) else base.values()):
+                if stat.S_ISREG(info.mode) and info.size >= min_size:
+                    self.keys.add((info.size, int(info.mtime)))
+
+    # The held path is only given back by pairs() and rest() -> True if it's held
+    def hold(self, action: str, relative: str, server_info: Optional[files_info], client_info: Optional[files_info]) -> bool:
+
+        if not self.keys:
+
+            return False
+
+        if action == "download" and client_info is None:
+            info, kind, base = server_info, SERVER, self.server_base
+
+        elif action == "upload" and server_info is None:
+            info, kind, base = client_info, CLIENT, self.client_base
+
+        else:
+
+            return False
+
+        if info is None:
+
+            return False
+
+        synced = relative in self.server_base and relative in self.client_base
+
+        if stat.S_ISDIR(info.mode) and synced:
+            self.dirs.append((kind, relative))
+
+            return True
+
+        if not stat.S_ISREG(info.mode) or info.size < self.min_size:
+
+            return False
+
+        key = (info.size, int(info.mtime))
+
+        # Synced before, and not changed on the side that still have it -> it's moved, or deleted, on the other side
+        if synced and (base[relative].size, int(base[relative].mtime)) == key:
+            self.gone.setdefault((kind, key), []).append((relative, info))
+
+            return True
+
+        # Never synced, and the same as one synced file -> it can be the moved file
+        if relative not in self.server_base and relative not in self.client_base and key in self.keys:
+            self.new.setdefault((CLIENT if kind == SERVER else SERVER, key), []).append((relative, info))
+
+            return True
+
+        return False
+
+    # The pairs -> [(side to rename on, old relative, new relative, info)]
+    # hasher(side, relative, info) -> content hash, used when it's given to check every pair, and to split the same (size, mtime)
+    def pairs(self, hasher: Optional[Callable] = None) -> list[tuple[str, str, str, files_info]]:
+
+        result = []
+
+        for slot, gone in self.gone.items():
+            new = self.new.get(slot)
+
+            if not new:
+
+                continue
+
+            side = slot[0]
+            other = CLIENT if side == SERVER else SERVER
+            matched = []
+
+            # One on each side, or the same file name, like the moved directory
+            if len(gone) == 1 and len(new) == 1:
+                matched = [(gone[0], new[0])]
+
+            else:
+                gone_names: Dict[str, list] = {}
+                new_names: Dict[str, list] = {}
+
+                for entry in gone:
+                    gone_names.setdefault(os.path.basename(entry[0]), []).append(entry)
+
+                for entry in new:
+                    new_names.setdefault(os.path.basename(entry[0]), []).append(entry)
+
+                for name, entries in gone_names.items():
+                    if len(entries) == 1 and len(new_names.get(name, ())) == 1:
+                        matched.append((entries[0], new_names[name][0]))
+
+            # The old file is on the side that is renamed, the new file on the other side
+            if hasher is not None:
+                matched = [(old, moved) for old, moved in matched if hasher(side, old[0], old[1]) == hasher(other, moved[0], moved[1])]
+                paired = {old[0] for old, _ in matched} | {moved[0] for _, moved in matched}
+                digests: Dict[str, list] = {}
+
+                for entry in new:
+                    if entry[0] not in paired:
+                        digests.setdefault(hasher(other, entry[0], entry[1]), []).append(entry)
+
+                for entry in gone:
+                    candidates = digests.get(hasher(side, entry[0], entry[1])) if entry[0] not in paired else None
+
+                    if candidates:
+                        matched.append((entry, candidates.pop()))
+
+            for (old, info), (moved, _) in matched:
+                result.append((side, old, moved, info))
+
+        return result
+
+    # The held directory that the moved file came out of -> [(side, relative)], the deepest first
+    # It's removed if it's empty now, the rest go back to the copy by rest()
+    def emptied(self, pairs: list[tuple[str, str, str, files_info]]) -> list[tuple[str, str]]:
+
+        parents = {(side, os.path.dirname(old)) for side, old, _, _ in pairs}
+
+        # Every parent up to the root
+        for side, parent in list(parents):
+            while parent:
+                parent = os.path.dirname(parent)
+                parents.add((side, parent))
+
+        return sorted((entry for entry in self.dirs if entry in parents), key=lambda entry: entry[1].count("/"), reverse=True)
+
+    # Every held path that is not in the given pairs, and not the removed directory -> [(action, relative)]
+    def rest(self, pairs: list[tuple[str, str, str, files_info]], removed: set[str] = frozenset()) -> list[tuple[str, str]]:
+
+        used = {old for _, old, _, _ in pairs} | {moved for _, _, moved, _ in pairs}
+        result = []
+
+        # The directory first, the file in it need it
+        for side, relative in self.dirs:
+            if relative not in removed:
+                result.append(("download" if side == SERVER else "upload", relative))
+
+        for (side, _), entries in self.gone.items():
+            for relative, _ in entries:
+                if relative not in used:
+                    result.append(("download" if side == SERVER else "upload", relative))
+
+        for (side, _), entries in self.new.items():
+            for relative, _ in entries:
+                if relative not in used:
+                    result.append(("upload" if side == SERVER else "download", relative))
+
+        return result
@@ -0,0 +1,214 @@
+import os
+import stat
+import time
+import uuid
+import statistics
+from math import ceil
+from typing import Dict, Iterable, Optional
+from colorama import Fore
+from core.index import files_info
+from core.resume import partial_suffix
+
+"""--------------------------------
+||| The Transfer Plan Function |||
+--------------------------------"""
+
+# The round trips of one file copy, the open, fstat, close, and the mtime set
+file_round_trips: int = 4
+
+# The round trips of one tar batch, the exec, and the exit status
+batch_round_trips: int = 2
+
+# The paths of one rm over exec, about 64 KiB of arguments
+exec_delete_paths: int = 1000
+
+# The totals of one action, or one top directory of it
+def _totals() -> Dict[str, int]:
+
+    return {"files": 0, "dirs": 0, "bytes": 0, "small_files": 0, "small_bytes": 0}
+
+# Count one path, the file smaller than small_size go in the tar batch
+def _add(totals: Dict[str, int], info: files_info, small_size: int) -> None:
+
+    if stat.S_ISDIR(info.mode):
+        totals["dirs"] += 1
+
+        return
+
+    totals["files"] += 1
+    totals["bytes"] += info.size
+
+    if info.size < small_size:
+        totals["small_files"] += 1
+        totals["small_bytes"] += info.size
+
+# The action list -> {action: {"total": totals, "top": {top directory: totals}}}
+# The file in the root is under ".", and the top directory itself is counted in its own name
+def summarize(actions: Iterable[tuple[str, str, files_info]], small_size: int = 0) -> dict:
+
+    summary: dict = {}
+
+    for action, relative, info in actions:
+        entry = summary.setdefault(action, {"total": _totals(), "top": {}})
+        top = relative.split("/", 1)[0] if "/" in relative or stat.S_ISDIR(info.mode) else "."
+        _add(entry["total"], info, small_size)
+        _add(entry["top"].setdefault(top, _totals()), info, small_size)
+
+    return summary
+
+# Measure the link of now -> {"rtt": seconds, "upload": bytes per second, "download": bytes per second}, 0 if not measured
+# The probe file is random so the SSH compression don't help it, and it's named as the partial file so no listing see it
+def measure_link(sftp, root: str, size: int = 4 * 1024 * 1024, samples: int = 5) -> dict:
+
+    rtts = []
+
+    for _ in range(max(samples, 1)):
+        start = time.perf_counter()
+        sftp.stat(root)
+        rtts.append(time.perf_counter() - start)
+
+    rtt = statistics.median(rtts)
+    link = {"rtt": rtt, "upload": 0.0, "download": 0.0}
+
+    if size <= 0:
+
+        return link
+
+    probe = f"{root}/.vsfs-probe-{uuid.uuid4().hex}{partial_suffix}"
+    data = os.urandom(size)
+
+    try:
+        start = time.perf_counter()
+
+        with sftp.sftp.open(probe, "wb") as file:
+            file.set_pipelined(True)
+
+            for offset in range(0, size, 32 * 1024):
+                file.write(data[offset:offset + 32 * 1024])
+
+        # Without the open, and the close
+        link["upload"] = size / max(time.perf_counter() - start - 2 * rtt, 1e-6)
+        start = time.perf_counter()
+
+        with sftp.sftp.open(probe, "rb") as file:
+            file.prefetch(size)
+            file.read(size)
+
+        link["download"] = size / max(time.perf_counter() - start - 2 * rtt, 1e-6)
+
+    except Exception as e:
+        print(f"{Fore.YELLOW}[WARN] Throughput probe failed: {e}, only the round trip is measured")
+
+    finally:
+
+        try:
+            sftp.sftp.remove(probe)
+
+        except Exception:
+
+            pass
+
+    return link
+
+# The seconds of one action -> None, if the throughput is not known
+# The round trips are shared by the workers, the bytes are not, every channel use the same link
+def estimate(action: str, totals: Dict[str, int], link: dict, workers: int = 1, batch_files: int = 0, delete_exec: bool = False) -> Optional[float]:
+
+    rtt = link["rtt"]
+    workers = max(workers, 1)
+
+    # The local delete don't wait the network
+    if action == "delete client":
+
+        return 0.0
+
+    if action == "delete server":
+        entries = totals["files"] + totals["dirs"]
+
+        if delete_exec:
+
+            return (ceil(entries / exec_delete_paths) + 1) * rtt
+
+        return entries * rtt / workers
+
+    rate = link.get(action, 0)
+
+    if not rate:
+
+        return None
+
+    small = totals["small_files"] if batch_files > 0 else 0
+    round_trips = (totals["files"] - small) * file_round_trips + ceil(small / max(batch_files, 1)) * batch_round_trips
+
+    # The directory is made on server one by one, on client it's only the local mkdir
+    if action == "upload":
+        round_trips += totals["dirs"]
+
+    return round_trips * rtt / workers + totals["bytes"] / rate
+
+# The summary with the estimate -> the plan, what render() and the JSON output show
+def build_plan(summary: dict, link: dict, workers: Dict[str, int], batch_files: int = 0, delete_exec: bool = False) -> dict:
+
+    actions = {}
+    total: Optional[float] = 0.0
+
+    for action, entry in summary.items():
+        options = (workers.get(action, 1), batch_files, delete_exec)
+        seconds = estimate(action, entry["total"], link, *options)
+        top = {name: {**totals, "seconds": estimate(action, totals, link, *options)} for name, totals in entry["top"].items()}
+        actions[action] = {**entry["total"], "seconds": seconds, "top": top}
+        total = None if total is None or seconds is None else total + seconds
+
+    return {"link": link, "actions": actions, "total_seconds": total}
+
+# 1536 -> "1.5 KiB"
+def _size(size: float) -> str:
+
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+        size /= 1024
+
+    return f"{size:.1f} TiB"
+
+# 3725 -> "1h 2m 5s"
+def _duration(seconds: Optional[float]) -> str:
+
+    if seconds is None:
+
+        return "unknown"
+
+    if seconds < 60:
+
+        return f"{seconds:.1f}s"
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    return f"{hours}h {minutes}m {seconds}s" if hours else f"{minutes}m {seconds}s"
+
+# The plan for the people -> the lines, the top directories by size, the biggest first
+def render(plan: dict, top: int = 10) -> str:
+
+    link = plan["link"]
+    rate = lambda value: f"{_size(value)}/s" if value else "not measured"
+    lines = [f"Link: RTT {link['rtt'] * 1000:.1f} ms, upload {rate(link['upload'])}, download {rate(link['download'])}", ""]
+
+    if not plan["actions"]:
+        lines.append("Nothing to do, the trees are identical")
+
+    for action, entry in plan["actions"].items():
+        lines.append(f"{action:<14} {entry['files']:>8} files {entry['dirs']:>6} dirs {_size(entry['bytes']):>11}   ~ {_duration(entry['seconds'])}")
+        biggest = sorted(entry["top"].items(), key=lambda item: (-item[1]["bytes"], item[0]))
+
+        for name, totals in biggest[:top]:
+            lines.append(f"    {name:<26} {totals['files']:>8} files {_size(totals['bytes']):>11}   ~ {_duration(totals['seconds'])}")
+
+        if len(biggest) > top:
+            lines.append(f"    ... {len(biggest) - top} more")
+
+    lines += ["", f"Total ~ {_duration(plan['total_seconds'])}"]
+
+    return "\n".join(lines)
@@ -0,0 +1,54 @@
+import threading
+from typing import Callable
+from colorama import Fore
+
+"""-------------------------------
+||| The Connection Pool Function |||
+-------------------------------"""
+
+# Keep one live SFTP connection for the whole session, and reconnect it when it die
+class SFTPPool:
+
+    # connect() make a new SFTP manager
+    def __init__(self, connect: Callable):
+        self.connect = connect
+        self.sftp = None
+        self.lock = threading.Lock()
+
+    # Check the connection still answer
+    def _healthy(self) -> bool:
+
+        if self.sftp is None or not self.sftp.is_alive():
+
+            return False
+
+        try:
+            self.sftp.stat(".")
+
+            return True
+
+        except Exception:
+
+            return False
+
+    # Return the live SFTP manager, connect or reconnect if needed
+    def get(self):
+
+        with self.lock:
+            if not self._healthy():
+                if self.sftp is not None:
+                    print(f"{Fore.YELLOW}[RECONNECT] SFTP connection is lost, connecting again...")
+                    self.sftp.close()
+
+                self.sftp = None
+                self.sftp = self.connect()
+
+            return self.sftp
+
+    # Closing the connection, the next get() connect again
+    def close(self) -> None:
+
+        with self.lock:
+            if self.sftp is not None:
+                self.sftp.close()
+                self.sftp = None
@@ -0,0 +1,293 @@
+import os
+import stat
+import shlex
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from colorama import Fore
+from core.index import files_info
+from core.transfer import ChannelExecutor
+
+"""-------------------------------
+||| The Deletion Plan Function |||
+-------------------------------"""
+
+# The server can run rm over the exec channel, per transport
+_exec_supported: Dict[int, bool] = {}
+
+# The longest command of one rm, far under the ARG_MAX of the server
+command_size: int = 64 * 1024
+
+# The paths to delete with the listed metadata, nothing is stat again
+# The deleted directory take everything under it, so the path that have the deleted parent belong to the root of it
+class DeletePlan:
+
+    def __init__(self, entries: Iterable[tuple[str, files_info]]):
+        self.entries: Dict[str, files_info] = dict(entries)
+        self.members: Dict[str, list[str]] = {}
+        self.root_of: Dict[str, str] = {}
+        self.files = self.dirs = self.bytes = 0
+
+        # The parent first, so the root of the parent is known
+        for relative in sorted(self.entries, key=lambda relative: relative.count("/")):
+            info = self.entries[relative]
+            parent = relative.rpartition("/")[0]
+            root = self.root_of[parent] if parent in self.entries else relative
+            self.members.setdefault(root, []).append(relative)
+            self.root_of[relative] = root
+
+            if stat.S_ISDIR(info.mode):
+                self.dirs += 1
+
+            else:
+                self.files += 1
+                self.bytes += info.size
+
+    def __len__(self) -> int:
+
+        return len(self.entries)
+
+    # The top deleted paths, sorted -> [(relative, info, entries under it, bytes under it)]
+    def roots(self) -> list[tuple[str, files_info, int, int]]:
+
+        result = []
+
+        for root in sorted(self.members):
+            members = self.members[root]
+            size = sum(self.entries[relative].size for relative in members if not stat.S_ISDIR(self.entries[relative].mode))
+            result.append((root, self.entries[root], len(members), size))
+
+        return result
+
+    # The paths by depth, the deepest first -> [[(relative, is_dir)]], every directory come after everything in it
+    def levels(self) -> list[list[tuple[str, bool]]]:
+
+        depths: Dict[int, list[tuple[str, bool]]] = {}
+
+        for relative, info in self.entries.items():
+            depths.setdefault(relative.count("/"), []).append((relative, stat.S_ISDIR(info.mode)))
+
+        return [depths[depth] for depth in sorted(depths, reverse=True)]
+
+# Mark the parents of the failed path, the directory that still have something in it can't be removed
+def _block(blocked: set[str], relative: str) -> None:
+
+    parent = relative.rpartition("/")[0]
+
+    while parent and parent not in blocked:
+        blocked.add(parent)
+        parent = parent.rpartition("/")[0]
+
+# The arguments of one command, not longer than command_size
+def _chunks(paths: list[str], root: str):
+
+    chunk, size = [], 0
+
+    for relative in paths:
+        quoted = shlex.quote(f"{root}/{relative}")
+
+        if chunk and size + len(quoted) + 1 > command_size:
+
+            yield chunk
+
+            chunk, size = [], 0
+
+        chunk.append(relative)
+        size += len(quoted) + 1
+
+    if chunk:
+
+        yield chunk
+
+# Run one command on the server -> (exit status, stderr lines)
+def _run(sftp, command: str) -> tuple[int, list[str]]:
+
+    channel = sftp.transport.open_session()
+
+    try:
+        channel.exec_command(command)
+
+        with channel.makefile_stderr("rb") as file:
+            stderr = file.read().decode(errors="replace")
+
+        return channel.recv_exit_status(), stderr.splitlines()
+
+    finally:
+        channel.close()
+
+# Run one rm on the server -> (exit status, stderr lines, the error of the command itself)
+# The command that can't start is one failed chunk, what it left is found by the lstat
+def _rm(sftp, command: str) -> tuple[int, list[str], Optional[str]]:
+
+    try:
+        status, lines = _run(sftp, command)
+
+    except Exception as e:
+
+        return -1, [], f"rm not run: {e}"
+
+    return status, lines, None
+
+# The paths that rm left, with what it said -> [(relative, message)]
+def _left(executor: ChannelExecutor, root: str, chunk: list[str], lines: list[str], error: Optional[str] = None) -> list[tuple[str, str]]:
+
+    def _exists(channel, relative: str) -> bool:
+
+        try:
+            channel.sftp.lstat(f"{root}/{relative}")
+
+        except FileNotFoundError:
+
+            return False
+
+        return True
+
+    futures = [(relative, executor.submit(_exists, relative)) for relative in chunk]
+    left = []
+
+    for relative, future in futures:
+        if future.result():
+            path = f"{root}/{relative}"
+            left.append((relative, next((line for line in lines if path in line), error or "still there after rm")))
+
+    return left
+
+# Remove the plan on server with rm over the exec channel -> (removed, failed), None if the server can't
+# Only the listed paths are given to rm -f and rmdir, the file that not listed, like the ignored one, is never touched
+# recursive -> rm -rf of the whole deleted directory, one command for the subtree, and the unlisted file in it go too
+def exec_delete(sftp, executor: ChannelExecutor, root: str, plan: DeletePlan, recursive: bool = False,
+                workers: int = 4) -> Optional[tuple[list[str], list[tuple[str, str]]]]:
+
+    key = id(sftp.transport)
+
+    if _exec_supported.get(key) is False:
+
+        return None
+
+    # Check rm is there, before anything is removed
+    try:
+        status, _ = _run(sftp, "command -v rm && command -v rmdir")
+
+    except Exception as e:
+        print(f"{Fore.YELLOW}[WARN] Server side delete failed: {e}, use the SFTP delete")
+        status = -1
+
+    _exec_supported[key] = status == 0
+
+    if status != 0:
+
+        return None
+
+    if recursive:
+        steps = [(list(sorted(plan.members)), "rm -rf --")]
+
+    else:
+        levels = plan.levels()
+        files = [relative for level in levels for relative, is_dir in level if not is_dir]
+        dirs = [relative for level in levels for relative, is_dir in level if is_dir]
+        steps = [(files, "rm -f --"), (dirs, "rmdir --")]
+
+    removed: list[str] = []
+    failed: list[tuple[str, str]] = []
+    blocked: set[str] = set()
+
+    # The file can go in any order, in parallel, the rmdir wait the file, and go one chunk after other, the deepest first
+    # The lstat of what left wait every rm, so the channels of it don't take the sessions of the rm
+    for paths, program in steps:
+        paths = [relative for relative in paths if relative not in blocked]
+        chunks = list(_chunks(paths, root))
+
+        with ThreadPoolExecutor(max_workers=max(workers if program != "rmdir --" else 1, 1)) as pool:
+            commands = [f"{program} " + " ".join(shlex.quote(f"{root}/{relative}") for relative in chunk) for chunk in chunks]
+            results = list(pool.map(lambda command: _rm(sftp, command), commands))
+
+        for chunk, (status, lines, error) in zip(chunks, results):
+            targets = [relative for top in chunk for relative in plan.members[top]] if recursive else chunk
+            left = _left(executor, root, targets, lines, error) if status != 0 else []
+            kept = {relative for relative, _ in left}
+
+            for relative, message in left:
+                _block(blocked, relative)
+                failed.append((relative, message))
+
+            removed.extend(relative for relative in targets if relative not in kept)
+
+    return removed, failed
+
+# Remove the plan on server with SFTP, one depth at a time, the paths of one depth at the same time on every channel
+def sftp_delete(executor: ChannelExecutor, root: str, plan: DeletePlan) -> tuple[list[str], list[tuple[str, str]]]:
+
+    removed: list[str] = []
+    failed: list[tuple[str, str]] = []
+    blocked: set[str] = set()
+
+    # The path that already gone is what we want too
+    def _remove(channel, relative: str, is_dir: bool) -> Optional[str]:
+
+        try:
+            (channel.rmdir if is_dir else channel.remove)(f"{root}/{relative}")
+
+        except FileNotFoundError:
+
+            pass
+
+        except Exception as e:
+
+            return str(e)
+
+        return None
+
+    for level in plan.levels():
+        futures = []
+
+        for relative, is_dir in level:
+            if relative in blocked:
+                failed.append((relative, "not empty, something in it is kept"))
+                _block(blocked, relative)
+
+                continue
+
+            futures.append((relative, executor.submit(_remove, relative, is_dir)))
+
+        for relative, future in futures:
+            error = future.result()
+
+            if error is None:
+                removed.append(relative)
+
+            else:
+                failed.append((relative, error))
+                _block(blocked, relative)
+
+    return removed, failed
+
+# Remove the plan on client, the deepest first
+def local_delete(root: str, plan: DeletePlan) -> tuple[list[str], list[tuple[str, str]]]:
+
+    removed: list[str] = []
+    failed: list[tuple[str, str]] = []
+    blocked: set[str] = set()
+
+    for level in plan.levels():
+        for relative, is_dir in level:
+            if relative in blocked:
+                failed.append((relative, "not empty, something in it is kept"))
+                _block(blocked, relative)
+
+                continue
+
+            try:
+                (os.rmdir if is_dir else os.unlink)(os.path.join(root, relative))
+
+            except FileNotFoundError:
+
+                pass
+
+            except OSError as e:
+                failed.append((relative, str(e)))
+                _block(blocked, relative)
+
+                continue
+
+            removed.append(relative)
+
+    return removed, failed
@@ -0,0 +1,241 @@
+import os
+import json
+import stat
+from typing import Callable, Optional
+
+"""---------------------------
+||| The Resumable Function |||
+---------------------------"""
+
+# The partial file, and the sidecar that remember how far it is
+partial_suffix: str = ".vsfs-partial"
+sidecar_suffix: str = ".vsfs-partial.json"
+
+# Read / write size of one chunk, on local side
+chunk_size: int = 1024 * 1024
+
+# Save the sidecar every N bytes
+checkpoint_size: int = 8 * 1024 * 1024
+
+# Check the name is a partial file, or the sidecar
+def is_partial(name: str) -> bool:
+
+    return name.endswith(partial_suffix) or name.endswith(sidecar_suffix)
+
+# The offset to resume from -> 0, if the sidecar is for other source or the partial is shorter
+def _resume_offset(sidecar: Optional[dict], size: int, mtime: float, partial_size: int) -> int:
+
+    if not sidecar or sidecar.get("size") != size or int(sidecar.get("mtime", -1)) != int(mtime):
+
+        return 0
+
+    offset = sidecar.get("offset", 0)
+
+    return offset if 0 < offset <= partial_size else 0
+
+# Read the remote file one chunk at a time, every chunk wait for the tokens before it's asked
+def _throttled_read(remote, offset: int, size: int, buffer_size: int, throttle: Callable[[int], None]):
+
+    while offset < size:
+        length = min(buffer_size, size - offset)
+        throttle(length)
+        chunk = b"".join(remote.readv([(offset, length)]))
+
+        if not chunk:
+
+            break
+
+        yield chunk
+
+        offset += len(chunk)
+
+# Give the partial file the mode of the file it replace, the copy in place kept it, the new file keep the umask one
+def keep_mode(partial: str, path: str) -> None:
+
+    try:
+        os.chmod(partial, stat.S_IMODE(os.stat(path).st_mode))
+
+    except FileNotFoundError:
+
+        pass
+
+# Wait the answer of every pipelined write of the remote file
+# The next request on the same SFTP session would read their answer, and the write after it wait for it forever
+def _drain(remote) -> None:
+
+    remote.flush()
+
+    while remote._reqs:
+        remote.sftp._read_response(remote._reqs.popleft())
+
+# Download into partial file, resume it if there is one, and rename when it's done
+def resumable_get(sftp, remote_path: str, local_path: str, size: int, mtime: float,
+                  callback: Optional[Callable[[int, int], None]] = None, buffer_size: int = chunk_size,
+                  prefetch_requests: Optional[int] = None, request_size: Optional[int] = None,
+                  throttle: Optional[Callable[[int], None]] = None) -> int:
+
+    # Return the offset it resumed from
+    partial = local_path + partial_suffix
+    sidecar_path = local_path + sidecar_suffix
+    sidecar = None
+
+    try:
+        with open(sidecar_path) as file:
+            sidecar = json.load(file)
+
+    except (OSError, ValueError):
+
+        pass
+
+    partial_size = os.path.getsize(partial) if os.path.exists(partial) else 0
+    offset = _resume_offset(sidecar, size, mtime, partial_size)
+
+    def _save(done: int) -> None:
+
+        with open(sidecar_path, "w") as file:
+            json.dump({"offset": done, "size": size, "mtime": mtime, "source": remote_path}, file)
+
+    with sftp.sftp.open(remote_path, "rb") as remote, open(partial, "r+b" if offset else "wb") as local:
+        remote.seek(offset)
+        local.seek(offset)
+        local.truncate(offset)
+
+        # Bigger SFTP read request, if the server allow it
+        if request_size:
+            remote.MAX_REQUEST_SIZE = request_size
+
+        # Ask the rest of the file ahead, with N read requests in flight
+        if throttle is None:
+            remote.prefetch(size, max_concurrent_requests=prefetch_requests)
+            chunks = iter(lambda: remote.read(buffer_size), b"")
+
+        # The prefetch don't wait the reader, ask one chunk at a time so the wire wait for the tokens too
+        else:
+            chunks = _throttled_read(remote, offset, size, buffer_size, throttle)
+
+        done = offset
+        saved = offset
+
+        for chunk in chunks:
+            local.write(chunk)
+            done += len(chunk)
+
+            # Only the data on disk is committed
+            if done - saved >= checkpoint_size:
+                local.flush()
+                os.fsync(local.fileno())
+                _save(done)
+                saved = done
+
+            if callback:
+                callback(done, size)
+
+    keep_mode(partial, local_path)
+    os.replace(partial, local_path)
+
+    try:
+        os.remove(sidecar_path)
+
+    except FileNotFoundError:
+
+        pass
+
+    return offset
+
+# Upload into partial file on server, resume it if there is one, and rename when it's done
+def resumable_put(sftp, local_path: str, remote_path: str, size: int, mtime: float,
+                  callback: Optional[Callable[[int, int], None]] = None, buffer_size: int = chunk_size,
+                  request_size: Optional[int] = None, throttle: Optional[Callable[[int], None]] = None) -> int:
+
+    # Return the offset it resumed from
+    partial = remote_path + partial_suffix
+    sidecar_path = remote_path + sidecar_suffix
+    sidecar = None
+
+    try:
+        with sftp.sftp.open(sidecar_path, "r") as file:
+            sidecar = json.loads(file.read())
+
+    except (OSError, ValueError):
+
+        pass
+
+    try:
+        partial_size = sftp.sftp.stat(partial).st_size
+
+    except OSError:
+        partial_size = 0
+
+    offset = _resume_offset(sidecar, size, mtime, partial_size)
+
+    def _save(done: int) -> None:
+
+        with sftp.sftp.open(sidecar_path, "w") as file:
+            file.write(json.dumps({"offset": done, "size": size, "mtime": mtime, "source": local_path}))
+
+    with open(local_path, "rb") as local, sftp.sftp.open(partial, "r+" if offset else "w") as remote:
+        local.seek(offset)
+        remote.seek(offset)
+        remote.truncate(offset)
+
+        # Bigger SFTP write request, if the server allow it
+        if request_size:
+            remote.MAX_REQUEST_SIZE = request_size
+
+        # Don't wait the answer of every write, like sftp.put
+        remote.set_pipelined(True)
+
+        done = offset
+        saved = offset
+
+        for chunk in iter(lambda: local.read(buffer_size), b""):
+            if throttle:
+                throttle(len(chunk))
+
+            remote.write(chunk)
+            done += len(chunk)
+
+            # Only the data on server is committed
+            if done - saved >= checkpoint_size:
+                _drain(remote)
+                _save(done)
+                saved = done
+
+            if callback:
+                callback(done, size)
+
+    # Same as confirm=True of sftp.put
+    if sftp.sftp.stat(partial).st_size != size:
+        raise IOError(f"size mismatch in put! {partial}")
+
+    # Keep the mode of the old file, as keep_mode() on client
+    try:
+        sftp.sftp.chmod(partial, stat.S_IMODE(sftp.sftp.stat(remote_path).st_mode))
+
+    except IOError:
+
+        pass
+
+    # Replace the old file at once, posix-rename if server have it
+    try:
+        sftp.sftp.posix_rename(partial, remote_path)
+
+    except IOError:
+
+        try:
+            sftp.sftp.remove(remote_path)
+
+        except IOError:
+
+            pass
+
+        sftp.sftp.rename(partial, remote_path)
+
+    try:
+        sftp.sftp.remove(sidecar_path)
+
+    except IOError:
+
+        pass
+
+    return offset
@@ -0,0 +1,124 @@
+import os
+import stat
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from colorama import Fore
+from core.index import FileIndex, files_info
+from core.ignore import IgnoreRules
+from core.resume import is_partial
+
+"""---------------------------
+||| The Local Scan Function |||
+---------------------------"""
+
+# Check the symlink directory point back to the directory it's in, or one of the parent
+def _is_loop(path: str, root: str, target: os.stat_result) -> bool:
+
+    key = (target.st_dev, target.st_ino)
+    path = os.path.normpath(path)
+    root = os.path.normpath(root)
+
+    while True:
+        status = os.stat(path)
+
+        if (status.st_dev, status.st_ino) == key:
+
+            return True
+
+        if path == root or os.path.dirname(path) == path:
+
+            return False
+
+        path = os.path.dirname(path)
+
+# List one local directory -> [(name, info)] sorted by name, one stat per entry
+# relative is the path of the directory under root, for the ignore rules, the ignored entry is never stat
+def scan_dir(path: str, root: str, ignore: Optional[IgnoreRules] = None, relative: str = "") -> list[tuple[str, files_info]]:
+
+    entries = []
+    ignored = ignore.for_dir(relative) if ignore else None
+
+    with os.scandir(path) as iterator:
+        for entry in iterator:
+
+            # Skip the unfinished copy
+            if is_partial(entry.name):
+
+                continue
+
+            if ignored and ignored(entry.name, entry.is_dir()):
+
+                continue
+
+            # DirEntry cache the stat, and follow the symlink same as Path.is_dir()
+            try:
+                status = entry.stat()
+
+            except OSError:
+
+                # The broken symlink
+                continue
+
+            if stat.S_ISDIR(status.st_mode):
+                if entry.is_symlink() and _is_loop(path, root, status):
+                    print(f"{Fore.YELLOW}[WARN] Skipped symlink loop: {entry.path}")
+
+                    continue
+
+                entries.append((entry.name, files_info(0, status.st_mtime, status.st_mode)))
+
+            elif stat.S_ISREG(status.st_mode):
+                entries.append((entry.name, files_info(status.st_size, status.st_mtime, status.st_mode)))
+
+    entries.sort()
+
+    return entries
+
+# Walk the local tree -> FileIndex of every file and dir under root
+# More than one worker list the directories at same time, for the network filesystem or slow disk
+def scan_tree(root, workers: int = 1, ignore: Optional[IgnoreRules] = None) -> FileIndex:
+
+    root = os.path.normpath(str(root))
+    result = FileIndex()
+
+    # List one directory, and return the sub-dir to walk next
+    def _scan(relative: str) -> list[str]:
+
+        try:
+            entries = scan_dir(os.path.join(root, relative) if relative else root, root, ignore, relative)
+
+        except OSError as e:
+            print(f"{Fore.RED}[ERROR] walking to client tree: {relative or root}: {e}")
+
+            return []
+
+        subdirs = []
+
+        for name, info in entries:
+            path = f"{relative}/{name}" if relative else name
+            result[path] = info
+
+            if stat.S_ISDIR(info.mode):
+                subdirs.append(path)
+
+        return subdirs
+
+    if workers <= 1:
+        stack = [""]
+
+        while stack:
+            stack.extend(reversed(_scan(stack.pop())))
+
+        return result
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan, "")}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                for relative in future.result():
+                    pending.add(executor.submit(_scan, relative))
+
+    return result
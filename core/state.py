@@ -0,0 +1,110 @@
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+"""----------------------------
+||| The Sync State Database |||
+----------------------------"""
+
+# Sides of the sync, saved on the same table
+SERVER = "server"
+CLIENT = "client"
+
+# The state of both side after the last successful sync
+class SyncState:
+
+    # Open (or create) the SQLite database
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                side  TEXT NOT NULL,
+                path  TEXT NOT NULL,
+                size  INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                mode  INTEGER NOT NULL,
+                hash  TEXT,
+                PRIMARY KEY (side, path)
+            ) WITHOUT ROWID"""
+        )
+
+        # The small values of the last run, like the time of the last full scan
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self.db.commit()
+
+    # Yield (Relative path, (size, mtime, mode)) of one side, without hold all rows at once
+    def rows(self, side: str) -> Iterator[tuple]:
+
+        for path, size, mtime, mode in self.db.execute("SELECT path, size, mtime, mode FROM entries WHERE side = ?", (side,)):
+
+            yield path, (size, mtime, mode)
+
+    # Return as {Relative path: (size, mtime, mode)} of one side
+    def load(self, side: str) -> Dict[str, tuple]:
+
+        return dict(self.rows(side))
+
+    # Return as {Relative path: (size, mtime, hash)} of one side, only the hashed entries
+    def hashes(self, side: str) -> Dict[str, tuple]:
+
+        rows = self.db.execute("SELECT path, size, mtime, hash FROM entries WHERE side = ? AND hash IS NOT NULL", (side,))
+
+        return {path: (size, mtime, digest) for path, size, mtime, digest in rows}
+
+    # Replace the state of one side
+    def save(self, side: str, entries: Dict[str, tuple], hashes: Optional[Dict[str, str]] = None) -> None:
+
+        hashes = hashes or {}
+
+        with self.db:
+            self.db.execute("DELETE FROM entries WHERE side = ?", (side,))
+            self.db.executemany(
+                "INSERT INTO entries (side, path, size, mtime, mode, hash) VALUES (?, ?, ?, ?, ?, ?)",
+                ((side, path, info[0], info[1], info[2], hashes.get(path)) for path, info in entries.items())
+            )
+
+    # Return (size, mtime, mode) of one path -> None, if it's not in the state
+    def get(self, side: str, path: str) -> Optional[tuple]:
+
+        return self.db.execute("SELECT size, mtime, mode FROM entries WHERE side = ? AND path = ?", (side, path)).fetchone()
+
+    # Add or replace some entries of one side, without rewrite the whole side
+    def update(self, side: str, entries: Dict[str, tuple]) -> None:
+
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO entries (side, path, size, mtime, mode, hash) VALUES (?, ?, ?, ?, ?, NULL)",
+                ((side, path, info[0], info[1], info[2]) for path, info in entries.items())
+            )
+
+    # Remove the paths of one side, and everything under it
+    def remove(self, side: str, paths: Iterable[str]) -> None:
+
+        # "/" + 1 is "0", so the range is every path under the directory
+        with self.db:
+            self.db.executemany(
+                "DELETE FROM entries WHERE side = ? AND (path = ? OR (path > ? AND path < ?))",
+                ((side, path, path + "/", path + "0") for path in paths)
+            )
+
+    # Return one value of the last run -> default, if it's not saved
+    def get_meta(self, key: str, default=None):
+
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+
+        return row[0] if row else default
+
+    # Save one value for the next run
+    def set_meta(self, key: str, value) -> None:
+
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # Closing the database
+    def close(self) -> None:
+
+        self.db.close()
@@ -1,44 +1,54 @@
-from core.main import SFTP, list_server, list_client, compute_diffs, copy_server, copy_client, user_config
+import sys
+from core.main import SyncState, pool, stream_sync, state_file, user_config
 
 #################################################
 ### ||| The Synchronization for Systsemd ||| ###
 ################################################
 
-def main() -> None:
+# download, upload -> the direction of the command line, None follow user_config
+# Return the number of paths that failed to copy, the next run try them again
+def main(download: bool = None, upload: bool = True) -> int:
     
     # Intialize SFTP connection
-    sftp = SFTP()
-    
-    # Declare the list
-    server_map = list_server(sftp)
-    client_map = list_client()
-
-    download, upload = compute_diffs(server_map, client_map)
+    sftp = pool.get()
+    state = SyncState(state_file)
    
     # User configuration
     try:
         
-        if user_config == 1:
-            
-            if download:
-                copy_server(sftp, download)
+        if download is None:
+            download = user_config == 1
+        
+        if download and upload:
             
-            if upload:
-                copy_client(sftp, upload)
+            # Walk, diff, and copy at same time
+            pending, downloaded, uploaded = stream_sync(sftp, state, download=True, upload=True)
             print("\nSynchronization complete (bidirectional)")
 
-        else:
+        elif upload:
             
-            if upload:
-                copy_client(sftp, upload)
+            pending, downloaded, uploaded = stream_sync(sftp, state, download=False, upload=True)
             print("\nSynchronization complete (client to server only)")
         
-        if not (download or upload):
+        else:
+            
+            pending, downloaded, uploaded = stream_sync(sftp, state, download=True, upload=False)
+            print("\nSynchronization complete (server to client only)")
+        
+        if not pending:
             print("\nNothing to sync - trees are identical")
         
+        failed = set(pending) - set(downloaded) - set(uploaded)
+        
+        if failed:
+            print(f"\n{len(failed)} paths failed to sync, the next run try again")
+        
+        return len(failed)
+        
     finally:
         # Close SFTP connection
-        sftp.close()
+        state.close()
+        pool.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(1 if main() else 0)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import time
+import heapq
+import threading
+from itertools import count
+from typing import Callable, Iterable, Optional
+
+"""--------------------------------
+||| The Bandwidth Limit Function |||
+--------------------------------"""
+
+# Parse "HH:MM" -> minutes from midnight
+def _minutes(clock: str) -> int:
+
+    hours, minutes = clock.split(":")
+
+    return int(hours) * 60 + int(minutes)
+
+# The limit of now, in bytes per second -> 0 if not limited
+# schedule is [(start "HH:MM", end "HH:MM", upload limit, download limit)], the first one that match win
+def scheduled_limit(direction: str, default: int, schedule: list, now: Optional[float] = None) -> int:
+
+    local = time.localtime(now)
+    minute = local.tm_hour * 60 + local.tm_min
+
+    for start, end, upload, download in schedule:
+        start, end = _minutes(start), _minutes(end)
+
+        # The window over midnight, like 22:00 - 06:00
+        inside = start <= minute < end if start <= end else minute >= start or minute < end
+
+        if inside:
+
+            return upload if direction == "upload" else download
+
+    return default
+
+# Token bucket that every transfer of one direction share, the rate is read again on every take
+class TokenBucket:
+
+    # rate() return the bytes per second of now, 0 is not limited
+    def __init__(self, rate: Callable[[], int]):
+        self.rate = rate
+        self.tokens = 0.0
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    # Take N bytes, and sleep until they are allowed
+    # The bucket can go below zero, so the big chunk wait for it, and the next one wait after it
+    def consume(self, size: int) -> None:
+
+        rate = self.rate()
+
+        if rate <= 0:
+
+            return
+
+        with self.lock:
+            now = time.monotonic()
+
+            # One second of burst at most
+            self.tokens = min(float(rate), self.tokens + (now - self.last) * rate)
+            self.last = now
+            self.tokens -= size
+            delay = -self.tokens / rate if self.tokens < 0 else 0.0
+
+        if delay > 0:
+            time.sleep(delay)
+
+# File object that take the tokens for every read and write
+class Throttled:
+
+    def __init__(self, fileobj, throttle: Callable[[int], None]):
+        self.fileobj = fileobj
+        self.throttle = throttle
+
+    def read(self, size: int = -1) -> bytes:
+
+        data = self.fileobj.read(size)
+        self.throttle(len(data))
+
+        return data
+
+    def write(self, data: bytes) -> int:
+
+        self.throttle(len(data))
+
+        return self.fileobj.write(data)
+
+    def flush(self) -> None:
+
+        self.fileobj.flush()
+
+    def close(self) -> None:
+
+        self.fileobj.close()
+
+"""-------------------------------
+||| The Transfer Order Function |||
+-------------------------------"""
+
+# Give the items in the order of priority(item), the smallest first, looking N items ahead
+# The stream is not read to the end first, so the copy start while the walk is still going
+def prioritized(items: Iterable, priority: Callable, window: int = 1000):
+
+    heap: list = []
+    order = count()
+
+    for item in items:
+        heapq.heappush(heap, (priority(item), next(order), item))
+
+        if len(heap) >= window:
+
+            yield heapq.heappop(heap)[2]
+
+    while heap:
+
+        yield heapq.heappop(heap)[2]
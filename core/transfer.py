@@ -0,0 +1,193 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterable
+from colorama import Fore
+
+"""------------------------------
+||| The Transfer Queue Function |||
+------------------------------"""
+
+# Open a worker channel, or None to use the main channel
+def _open_channel(sftp_manager):
+
+    try:
+
+        return sftp_manager.channel()
+
+    except Exception as e:
+        print(f"{Fore.RED}[ERROR] Opening SFTP channel: {e}, use the main channel")
+
+        return None
+
+# Run a job for every item, with N workers each on own SFTP channel
+def run_transfers(sftp_manager, items: Iterable[str], job: Callable, workers: int = 1) -> int:
+
+    # Return the number of items that raise out of the job
+    failed = 0
+
+    # Single worker use the main channel, same as the old sequential copy
+    if workers <= 1:
+        for item in items:
+
+            try:
+                job(sftp_manager, item)
+
+            except Exception as e:
+                print(f"{Fore.RED}[FAILED] {item}: {e}")
+                failed += 1
+
+        return failed
+
+    work: queue.Queue = queue.Queue(maxsize=workers * 4)
+    lock = threading.Lock()
+    done = object()
+
+    def _worker() -> None:
+        nonlocal failed
+
+        # Every worker open own channel on the same transport
+        channel = _open_channel(sftp_manager)
+
+        try:
+            while True:
+                item = work.get()
+
+                if item is done:
+
+                    break
+
+                try:
+                    job(channel or sftp_manager, item)
+
+                except Exception as e:
+                    print(f"{Fore.RED}[FAILED] {item}: {e}")
+
+                    with lock:
+                        failed += 1
+
+        finally:
+            if channel is not None:
+                sftp_manager.release(channel)
+
+    threads = [threading.Thread(target=_worker, daemon=True) for _ in range(workers)]
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        for item in items:
+            work.put(item)
+
+    finally:
+        for _ in threads:
+            work.put(done)
+
+        for thread in threads:
+            thread.join()
+
+    return failed
+
+# Run a job breadth first, the job return the next items to put in queue
+def run_breadth_first(sftp_manager, roots: Iterable[str], job: Callable, workers: int = 1) -> None:
+
+    # Single worker walk the queue on the main channel
+    if workers <= 1:
+        pending = deque(roots)
+
+        while pending:
+            item = pending.popleft()
+
+            try:
+                pending.extend(job(sftp_manager, item))
+
+            except Exception as e:
+                print(f"{Fore.RED}[FAILED] {item}: {e}")
+
+        return
+
+    # Not limited, so the workers never block on put, the workers bound the requests in flight
+    work: queue.Queue = queue.Queue()
+    done = object()
+
+    def _worker() -> None:
+
+        channel = _open_channel(sftp_manager)
+
+        try:
+            while True:
+                item = work.get()
+
+                if item is done:
+                    work.task_done()
+
+                    break
+
+                try:
+                    for child in job(channel or sftp_manager, item):
+                        work.put(child)
+
+                except Exception as e:
+                    print(f"{Fore.RED}[FAILED] {item}: {e}")
+
+                finally:
+                    work.task_done()
+
+        finally:
+            if channel is not None:
+                sftp_manager.release(channel)
+
+    threads = [threading.Thread(target=_worker, daemon=True) for _ in range(workers)]
+
+    for thread in threads:
+        thread.start()
+
+    for item in roots:
+        work.put(item)
+
+    # Wait every item, and the items they add
+    work.join()
+
+    for _ in threads:
+        work.put(done)
+
+    for thread in threads:
+        thread.join()
+
+# Thread pool, that every thread have own SFTP channel
+class ChannelExecutor:
+
+    def __init__(self, sftp_manager, workers: int = 1):
+        self.sftp_manager = sftp_manager
+        self.local = threading.local()
+        self.channels = []
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+
+    # Channel of the current thread, open on first use
+    def _channel(self):
+
+        channel = getattr(self.local, "channel", None)
+
+        if channel is None:
+            channel = _open_channel(self.sftp_manager) or self.sftp_manager
+            self.local.channel = channel
+
+            with self.lock:
+                self.channels.append(channel)
+
+        return channel
+
+    # Run fn(channel, *args) on the pool, return the Future
+    def submit(self, fn: Callable, *args) -> Future:
+
+        return self.pool.submit(lambda: fn(self._channel(), *args))
+
+    # Wait the jobs, and give back the worker channels
+    def close(self) -> None:
+
+        self.pool.shutdown(wait=True)
+
+        for channel in self.channels:
+            self.sftp_manager.release(channel)
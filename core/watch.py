@@ -0,0 +1,227 @@
+import os
+import time
+import ctypes
+import ctypes.util
+import select
+import struct
+from typing import Callable, Dict, Iterable, Optional
+from colorama import Fore
+from core.resume import is_partial
+from core.ignore import IgnoreRules
+
+"""---------------------------
+||| The Watch Mode Function |||
+---------------------------"""
+
+# The inotify flags, from <sys/inotify.h>
+IN_ATTRIB: int = 0x00000004
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+IN_IGNORED: int = 0x00008000
+IN_ONLYDIR: int = 0x01000000
+IN_ISDIR: int = 0x40000000
+IN_NONBLOCK: int = 0o4000
+IN_CLOEXEC: int = 0o2000000
+
+# The file is only pushed when it's closed after write, not on every write
+watch_mask: int = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# struct inotify_event -> wd, mask, cookie, len, and the name after it
+_event = struct.Struct("iIII")
+
+# Push the change at least every N debounce, while the file keep changing
+max_delay_factor: int = 10
+
+# Watch every directory of the local tree with Linux inotify
+class Inotify:
+
+    def __init__(self, root: str, ignore: Optional[IgnoreRules] = None):
+        self.root = root
+        self.ignore = ignore
+
+        # {Watch descriptor: Relative dir}
+        self.watches: Dict[int, str] = {}
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, f"inotify_init1: {os.strerror(error)}")
+
+    # Watch one directory, and every directory in it -> the relative path of all entries in it
+    def add_tree(self, relative: str = "") -> list[str]:
+
+        found = []
+        stack = [relative]
+
+        while stack:
+            relative = stack.pop()
+            path = os.path.join(self.root, relative) if relative else self.root
+            wd = self._add_watch(self.fd, os.fsencode(path), watch_mask | IN_ONLYDIR)
+
+            if wd < 0:
+                error = ctypes.get_errno()
+                print(f"{Fore.RED}[ERROR] Cannot watch {path}: {os.strerror(error)}")
+
+                continue
+
+            self.watches[wd] = relative
+            ignored = self.ignore.for_dir(relative) if self.ignore else None
+
+            try:
+                with os.scandir(path) as iterator:
+                    for entry in iterator:
+                        child = f"{relative}/{entry.name}" if relative else entry.name
+                        is_dir = entry.is_dir(follow_symlinks=False)
+
+                        # The ignored directory is never watched
+                        if ignored and ignored(entry.name, is_dir):
+
+                            continue
+
+                        found.append(child)
+
+                        if is_dir:
+                            stack.append(child)
+
+            except OSError as e:
+                print(f"{Fore.RED}[ERROR] Cannot list {path}: {e}")
+
+        return found
+
+    # Forget the watch under the moved directory, the same inode get the same wd if it's added again
+    def _forget(self, relative: str) -> None:
+
+        prefix = relative + "/"
+
+        for wd, path in list(self.watches.items()):
+            if path == relative or path.startswith(prefix):
+                del self.watches[wd]
+
+    # Read the waiting events -> (touched paths, overflow)
+    def read(self) -> tuple[set[str], bool]:
+
+        touched: set[str] = set()
+        overflow = False
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+
+        except BlockingIOError:
+
+            return touched, overflow
+
+        offset = 0
+
+        while offset < len(data):
+            wd, mask, _, length = _event.unpack_from(data, offset)
+            name = data[offset + _event.size:offset + _event.size + length].rstrip(b"\0")
+            offset += _event.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+
+                continue
+
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+
+                continue
+
+            parent = self.watches.get(wd)
+
+            if parent is None or not name:
+
+                continue
+
+            name = os.fsdecode(name)
+
+            # Skip the unfinished copy
+            if is_partial(name):
+
+                continue
+
+            relative = f"{parent}/{name}" if parent else name
+
+            if self.ignore and self.ignore.ignored(relative, bool(mask & IN_ISDIR)):
+
+                continue
+
+            touched.add(relative)
+
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._forget(relative)
+
+                # The files can be there before the watch is added
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    touched.update(self.add_tree(relative))
+
+        return touched, overflow
+
+    def close(self) -> None:
+
+        os.close(self.fd)
+
+# Wait the change of the local tree, and push it after the debounce
+# push(paths) get the touched relative paths, reconcile() do the full sync
+def watch(root: str, push: Callable[[Iterable[str]], None], reconcile: Callable[[], None],
+          debounce: float = 0.5, reconcile_interval: float = 3600, ignore: Optional[IgnoreRules] = None) -> None:
+
+    inotify = Inotify(root, ignore)
+
+    try:
+        inotify.add_tree()
+
+        # Start from the same state, the event before the watch is not seen
+        reconcile()
+        next_reconcile = time.monotonic() + reconcile_interval
+        touched: set[str] = set()
+        first_event = last_event = 0.0
+
+        while True:
+            now = time.monotonic()
+            timeout = next_reconcile - now
+
+            if touched:
+                timeout = min(timeout, last_event + debounce - now, first_event + debounce * max_delay_factor - now)
+
+            readable, _, _ = select.select([inotify.fd], [], [], max(timeout, 0))
+            full = False
+
+            if readable:
+                paths, full = inotify.read()
+
+                if paths:
+                    last_event = time.monotonic()
+
+                    if not touched:
+                        first_event = last_event
+
+                    touched.update(paths)
+
+            now = time.monotonic()
+
+            # The kernel drop the events, only the full sync know what changed
+            if full or now >= next_reconcile:
+                if full:
+                    print(f"{Fore.YELLOW}[WARN] Too many changes at once, running the full sync")
+
+                touched.clear()
+                reconcile()
+                next_reconcile = time.monotonic() + reconcile_interval
+
+            elif touched and (now - last_event >= debounce or now - first_event >= debounce * max_delay_factor):
+                paths = sorted(touched)
+                touched.clear()
+                push(paths)
+
+    finally:
+        inotify.close()
@@ -1,14 +1,13 @@
 import os
 import sys
 import json
-import getpass
-import subprocess
+import argparse
 from pathlib import Path
-from core.main import list_server_files, get_files, put_files, delete_server, delete_client
+
+# The core (paramiko, colorama, and config.py) is imported by the command that need it, --help and check stay fast
 
 # Configuration files
 config_dir: Path = Path("config")
-config_dir.mkdir(exist_ok=True)
 config_file: Path = config_dir / "config.py"
 systemd_service_file: str = "vsfs.service"
 systemd_timer_file: str = "vsfs.timer"
@@ -40,6 +39,8 @@ def config(server_loc: str, client_loc: str, user_cfg: int, sftp_cfg: str) -> No
     
     # Write file config.py
     try:
+        config_dir.mkdir(exist_ok=True)
+        
         with open(config_file, 'w') as file:
             file.write("#||| THE CONFIG LOCATION OF SERVER AND CLIENT |||")
             file.write("\n\n")
@@ -60,7 +61,154 @@ def config(server_loc: str, client_loc: str, user_cfg: int, sftp_cfg: str) -> No
             file.write("# The SFTP remote configuration")
             file.write("\n\n")
             file.write(f"sftp_config: dict = {sftp_cfg}")
-            
+            file.write("\n\n")
+            file.write("# The transfer configuration")
+            file.write("\n\n")
+            file.write("# How many files copy at same time, each one on own SFTP channel")
+            file.write("\n")
+            file.write("transfer_workers: int = 4")
+            file.write("\n")
+            file.write("# How many server directory list at same time, while walking the tree")
+            file.write("\n")
+            file.write("walk_workers: int = 8")
+            file.write("\n")
+            file.write("# How many client directory list at same time, more than 1 help on the network filesystem or slow disk")
+            file.write("\n")
+            file.write("scan_workers: int = 1")
+            file.write("\n")
+            file.write("# How many worker channels stay open between the works, every one take a session of the server")
+            file.write("\n")
+            file.write("idle_channels: int = 2")
+            file.write("\n")
+            file.write("# How many sessions the server allow on one connection, MaxSessions of the OpenSSH server")
+            file.write("\n")
+            file.write("max_sessions: int = 10")
+            file.write("\n")
+            file.write("# [auto] List the server tree with one find over SSH exec, and the SFTP walk if the server can't, [sftp] Always the SFTP walk")
+            file.write("\n")
+            file.write('server_listing: str = "auto"')
+            file.write("\n")
+            file.write("# [auto] Delete the listed server paths with rm over SSH exec, and SFTP if the server can't, [tree] rm -rf the whole deleted directory, [sftp] Always SFTP")
+            file.write("\n")
+            file.write('delete_mode: str = "auto"')
+            file.write("\n")
+            file.write("# How many server paths delete at same time with SFTP")
+            file.write("\n")
+            file.write("delete_workers: int = 8")
+            file.write("\n")
+            file.write("# The file smaller than this (bytes) copy together in one tar stream over SSH exec, 0 copy every file alone")
+            file.write("\n")
+            file.write("batch_threshold: int = 64 * 1024")
+            file.write("\n")
+            file.write("# The most files, and bytes in one batch")
+            file.write("\n")
+            file.write("batch_files: int = 256")
+            file.write("\n")
+            file.write("batch_bytes: int = 8 * 1024 * 1024")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Compress the whole SSH connection, help the text file on the slow link")
+            file.write("\n")
+            file.write("ssh_compression: bool = False")
+            file.write("\n")
+            file.write("# Compress the batch tar stream: [none], [gz], or [xz], the already compressed file (jpg, zip, ...) is skipped")
+            file.write("\n")
+            file.write('batch_compression: str = "none"')
+            file.write("\n")
+            file.write("# 1 is the fastest, 9 is the smallest")
+            file.write("\n")
+            file.write("compression_level: int = 1")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Bandwidth limit in bytes per second, shared by every transfer, 0 is not limited")
+            file.write("\n")
+            file.write("upload_limit: int = 0")
+            file.write("\n")
+            file.write("download_limit: int = 0")
+            file.write("\n")
+            file.write('# The limit by time of day, like [("09:00", "18:00", 1024 * 1024, 0)] -> (start, end, upload limit, download limit)')
+            file.write("\n")
+            file.write("limit_schedule: list = []")
+            file.write("\n")
+            file.write("# The copy order: [small] the small file first, [found] as the walk find it, the transfer_first globs go before the rest")
+            file.write("\n")
+            file.write('transfer_order: str = "small"')
+            file.write("\n")
+            file.write("transfer_first: list = []")
+            file.write("\n")
+            file.write("\n")
+            file.write("# gitignore style patterns that never walked nor copied, like [\".git/\", \"node_modules/\", \"*.pyc\"], the .vsfsignore file in the synced root is added after it")
+            file.write("\n")
+            file.write("ignore_patterns: list = []")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Rename the file moved on one side instead of copying it again, paired by (size, mtime), and by the content hash if move_checksum")
+            file.write("\n")
+            file.write("detect_moves: bool = True")
+            file.write("\n")
+            file.write("move_min_size: int = 1")
+            file.write("\n")
+            file.write("move_checksum: bool = False")
+            file.write("\n")
+            file.write("\n")
+            file.write("# How to know the file is changed, when there is no last sync state")
+            file.write("\n")
+            file.write("# [size] Size only, [mtime] Size and modified time, [checksum] Hash the content when the size is same")
+            file.write("\n")
+            file.write('compare_mode: str = "mtime"')
+            file.write("\n")
+            file.write("\n")
+            file.write("# The file bigger than this (bytes) that already on other side, only copy the changed blocks")
+            file.write("\n")
+            file.write("delta_threshold: int = 64 * 1024 * 1024")
+            file.write("\n")
+            file.write("delta_block_size: int = 128 * 1024")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Send keepalive every N seconds, so the shared connection don't drop while idle")
+            file.write("\n")
+            file.write("keepalive_interval: int = 30")
+            file.write("\n")
+            file.write("\n")
+            file.write("# The network tuning, bigger window let more data in flight on the high latency link")
+            file.write("\n")
+            file.write("window_size: int = 16 * 1024 * 1024")
+            file.write("\n")
+            file.write("max_packet_size: int = 32 * 1024")
+            file.write("\n")
+            file.write("# The size of one SFTP read/write request, some server allow up to 256 KB")
+            file.write("\n")
+            file.write("sftp_request_size: int = 32 * 1024")
+            file.write("\n")
+            file.write("# How many read request in flight for one download")
+            file.write("\n")
+            file.write("prefetch_requests: int = 128")
+            file.write("\n")
+            file.write("# The local read/write buffer of the copy")
+            file.write("\n")
+            file.write("buffer_size: int = 1024 * 1024")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Don't list the server directory that have the same mtime as the last sync, and list everything every N seconds")
+            file.write("\n")
+            file.write("# The file that changed in place is only seen on the full list, 0 always list everything")
+            file.write("\n")
+            file.write("full_rescan_interval: int = 0")
+            file.write("\n")
+            file.write("\n")
+            file.write("# Watch mode, push the change after N seconds without new change")
+            file.write("\n")
+            file.write("watch_debounce: float = 0.5")
+            file.write("\n")
+            file.write("# Run the full sync every N seconds while watching")
+            file.write("\n")
+            file.write("watch_reconcile_interval: int = 3600")
+            file.write("\n")
+            file.write("# Delete on server the file that deleted on client, only if the server copy is not changed")
+            file.write("\n")
+            file.write("watch_delete: bool = True")
+            file.write("\n")
+
         print(f"{config_file} has been written successfully.")
         
     except Exception as e:
@@ -120,6 +268,8 @@ def sftp():
             break
             
         if user_input == "P":
+            import getpass
+            
             password: str = getpass.getpass("Please input password!\n: ")
             
             sftp_config: dict = {
@@ -168,6 +318,8 @@ def systemd() -> None:
     systemd_user: str = input("Please input the name user of your systemd: ")
     systemd_group: str = input("Please input the name group of your systemd: ")
     
+    import subprocess
+    
     # Check location of this program
     main_py = subprocess.run(
         ["pwd"],
@@ -176,8 +328,8 @@ def systemd() -> None:
         check=True
     )
     
-    main_py = pathname(main_py.stdout)
-    main_py = main_py + "/core/sync.py"
+    main_dir = pathname(main_py.stdout)
+    main_py = main_dir + "vsfs.py"
     
     # Systemd.service config
     systemd_service: str = f"""
@@ -192,7 +344,8 @@ Group={systemd_group}
 
 Type=oneshot
 
-ExecStart=/usr/bin/python3 {main_py}
+WorkingDirectory={main_dir}
+ExecStart=/usr/bin/python3 {main_py} sync
 
 StandardOutput=journal
 StandardError=journal
@@ -307,6 +460,8 @@ def write_systemd() -> None:
             choice:str = input("[yes/no]: ").strip().lower()
             
             if choice == "yes" or choice == "y" or choice == "":
+                import subprocess
+                
                 systemd()
                 subprocess.run(["sh",move_files])
                 print("The systemd has created!")
@@ -336,6 +491,7 @@ def menu() -> None:
     print("[4] -> List Server!")
     print("[5] -> Deletes files!")
     print("[6] -> Make systemd!")
+    print("[7] -> Watch client changes!")
     print("[0] -> Exit!!!")
 
     user_input: int = int(input("> "))
@@ -348,16 +504,22 @@ def menu() -> None:
             break
         
         elif user_input == 2 :
+            from core.main import get_files
+            
             get_files()
             
             break
                 
         elif user_input == 3 :
+            from core.main import put_files
+            
             put_files()
 
             break
             
         elif user_input == 4 :
+            from core.main import list_server_files
+            
             list_server_files()
             
             break
@@ -366,6 +528,7 @@ def menu() -> None:
             print("\n")
             print("Deletes [server] or [client]")
             another_input = input("-> ")
+            from core.main import delete_server, delete_client
 
             while True:
 
@@ -389,12 +552,232 @@ def menu() -> None:
             
             break
         
+        elif user_input == 7 :
+            from core.main import watch_client
+            
+            watch_client()
+            
+            break
+        
         elif user_input == 0 :
+            
+            # Closing the SFTP connection of this session, only if the core is loaded
+            if "core.main" in sys.modules:
+                sys.modules["core.main"].pool.close()
+            
             sys.exit(0)
 
         else:
             continue
 
+"""------------------------- 
+||| The Command Function |||
+-------------------------"""
+
+# The settings that have a fixed choice -> the allowed values
+choices: dict = {
+    "server_listing": ("auto", "sftp"),
+    "delete_mode": ("auto", "tree", "sftp"),
+    "compare_mode": ("mtime", "size", "checksum"),
+    "batch_compression": ("none", "gz", "xz"),
+    "transfer_order": ("small", "found"),
+}
+
+# The settings that are a count -> the smallest allowed
+counts: dict = {
+    "transfer_workers": 1,
+    "walk_workers": 1,
+    "scan_workers": 1,
+    "idle_channels": 0,
+    "max_sessions": 2,
+    "delete_workers": 1,
+    "batch_threshold": 0,
+    "upload_limit": 0,
+    "download_limit": 0,
+    "full_rescan_interval": 0,
+}
+
+# Check config.py without connecting -> the problems, empty if it's good
+def check_config() -> list[str]:
+    
+    if not config_file.exists():
+        
+        return [f"{config_file} not found, run: vsfs config"]
+    
+    try:
+        from config import config as vsfs_config
+    
+    except Exception as e:
+        
+        return [f"{config_file} can't be loaded: {e}"]
+    
+    problems = []
+    
+    for name in ("server_location", "client_location", "user_config", "sftp_config"):
+        if not hasattr(vsfs_config, name):
+            problems.append(f"{name} is missing")
+    
+    if problems:
+        
+        return problems
+    
+    if vsfs_config.user_config not in (1, 2):
+        problems.append(f"user_config is {vsfs_config.user_config!r}, not 1 or 2")
+    
+    if not Path(vsfs_config.client_location).is_dir():
+        problems.append(f"client_location {vsfs_config.client_location} is not a directory")
+    
+    sftp_config = vsfs_config.sftp_config
+    
+    if not isinstance(sftp_config, dict) or not sftp_config.get("host") or not sftp_config.get("username"):
+        problems.append("sftp_config need the host, and the username")
+    
+    elif "password" not in sftp_config and "key_path" not in sftp_config:
+        problems.append("sftp_config need the password, or the key_path")
+    
+    elif "key_path" in sftp_config and not Path(sftp_config["key_path"]).expanduser().is_file():
+        problems.append(f"key_path {sftp_config['key_path']} is not a file")
+    
+    for name, allowed in choices.items():
+        value = getattr(vsfs_config, name, allowed[0])
+        
+        if value not in allowed:
+            problems.append(f"{name} is {value!r}, not one of {', '.join(allowed)}")
+    
+    for name, smallest in counts.items():
+        value = getattr(vsfs_config, name, smallest)
+        
+        if not isinstance(value, int) or value < smallest:
+            problems.append(f"{name} is {value!r}, need a number from {smallest}")
+    
+    return problems
+
+# The command line, the menu when there is no command
+def parser() -> argparse.ArgumentParser:
+    
+    parser = argparse.ArgumentParser(prog="vsfs", description="Very Simple Files Sync, between the SFTP server and the local directory")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+    
+    # The flags that every copy command have
+    copy = argparse.ArgumentParser(add_help=False)
+    copy.add_argument("-n", "--dry-run", action="store_true", help="Show what would be copied, and the plan of it, copy nothing")
+    copy.add_argument("-j", "--workers", type=int, help="Files copied at same time (transfer_workers)")
+    copy.add_argument("--walk-workers", type=int, help="Server directories listed at same time (walk_workers)")
+    
+    sync = commands.add_parser("sync", parents=[copy], help="Sync both side, or the direction of user_config")
+    sync.add_argument("-d", "--direction", choices=("both", "get", "put"), help="both, get (server to client), or put (client to server)")
+    commands.add_parser("get", parents=[copy], help="Copy the server changes to client")
+    commands.add_parser("put", parents=[copy], help="Copy the client changes to server")
+    commands.add_parser("ls", help="Show the server tree")
+    
+    plan = commands.add_parser("plan", help="Show what the sync would do, and how long it take on the link of now")
+    plan.add_argument("-d", "--direction", choices=("both", "get", "put"), help="both, get (server to client), or put (client to server)")
+    plan.add_argument("--prune", choices=("server", "client"), help="Delete the paths only on this side first, like prune")
+    plan.add_argument("-j", "--workers", type=int, help="Files copied at same time (transfer_workers)")
+    plan.add_argument("--probe-mb", type=float, default=4.0, help="Size of the throughput probe in MiB, 0 only measure the round trip")
+    plan.add_argument("--paths", action="store_true", help="Show every path too")
+    plan.add_argument("--json", action="store_true", help="Print the plan as JSON")
+    
+    prune = commands.add_parser("prune", help="Delete the paths that are only on one side")
+    prune.add_argument("side", choices=("server", "client"), help="The side to delete from")
+    prune.add_argument("-y", "--yes", action="store_true", help="Don't ask before deleting")
+    prune.add_argument("-n", "--dry-run", action="store_true", help="Show what would be deleted, delete nothing")
+    prune.add_argument("-j", "--workers", type=int, help="Server paths deleted at same time (delete_workers)")
+    
+    watch = commands.add_parser("watch", help="Push the client changes to server as they happen")
+    watch.add_argument("-j", "--workers", type=int, help="Files copied at same time (transfer_workers)")
+    
+    commands.add_parser("check", help="Check config.py, without connecting")
+    commands.add_parser("config", help="Create or change config.py")
+    commands.add_parser("systemd", help="Make the vsfs.service, and vsfs.timer")
+    
+    return parser
+
+# Run one command -> the exit status
+def run(args: argparse.Namespace) -> int:
+    
+    if args.command == "config":
+        write_config()
+        
+        return 0
+    
+    if args.command == "systemd":
+        systemd()
+        
+        return 0
+    
+    problems = check_config()
+    
+    for problem in problems:
+        print(f"[ERROR] {problem}", file=sys.stderr)
+    
+    if args.command == "check" or problems:
+        if not problems:
+            print(f"{config_file} is good")
+        
+        return 1 if problems else 0
+    
+    # Only the command that connect load the core
+    import core.main as core
+    
+    # The flags win over config.py
+    if getattr(args, "workers", None):
+        setattr(core, "delete_workers" if args.command == "prune" else "transfer_workers", args.workers)
+    
+    if getattr(args, "walk_workers", None):
+        core.walk_workers = args.walk_workers
+    
+    try:
+        if args.command == "ls":
+            core.list_server_files()
+        
+        elif args.command == "watch":
+            core.watch_client()
+        
+        elif args.command == "prune":
+            delete = core.delete_server if args.side == "server" else core.delete_client
+            delete(confirm=not args.yes, dry_run=args.dry_run)
+        
+        else:
+            direction = {"get": "get", "put": "put"}.get(args.command) or args.direction
+            direction = direction or ("both" if core.user_config == 1 else "put")
+            download, upload = direction in ("both", "get"), direction in ("both", "put")
+            
+            if args.command == "plan":
+                prune = {"server": core.SERVER, "client": core.CLIENT}.get(args.prune)
+                core.plan_sync(download, upload, prune, args.json, int(args.probe_mb * 1024 * 1024), args.paths)
+            
+            # The dry run write nothing on server, not even the probe
+            elif args.dry_run:
+                core.plan_sync(download, upload, probe_size=0, paths=True)
+            
+            else:
+                from core.sync import main as sync
+                
+                # The path that failed to copy fail the command too, for cron and systemd
+                if sync(download, upload):
+                    
+                    return 1
+    
+    except KeyboardInterrupt:
+        
+        return 130
+    
+    except Exception as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        
+        return 1
+    
+    finally:
+        core.pool.close()
+    
+    return 0
+
 if __name__ == "__main__":
+    args = parser().parse_args()
+    
+    if args.command:
+        sys.exit(run(args))
+    
     while True:
         menu()